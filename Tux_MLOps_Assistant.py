@@ -1,199 +1,97 @@
 #!/usr/bin/env python3
 """
-TUX MLOps Assistant - One File Application
-Run this ONE file and everything works!
+TUX MLOps Assistant - Desktop GUI
+Run this file; the chat engine (key rotation, retries, history) lives in src/
 """
 
 import os
 import sys
-import json
-import time
 from datetime import datetime
-from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
 import queue
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from chatbot import TuxChatbot
+from groq_client import GroqClient
+from history import ConversationHistory
+from prefetch import default_prefetcher
+from retrieval import default_index
 
 # ====================== CONFIGURATION ======================
+# Your API keys; leave empty to read GROQ_API_KEY_1..9 from .env
 API_KEYS = [
     ""  
 ]
 
-# ====================== GROQ CLIENT ======================
-class GroqClient:
-    def __init__(self):
-        self.api_keys = API_KEYS
-        self.current_key = 0
-        self.client = None
-        self.initialize_client()
-    
-    def initialize_client(self):
-        """Initialize Groq client with current API key"""
-        try:
-            from groq import Groq
-            self.client = Groq(api_key=self.api_keys[self.current_key])
-            return True
-        except ImportError:
-            print("Installing groq library...")
-            import subprocess
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "groq", "-q"])
-            from groq import Groq
-            self.client = Groq(api_key=self.api_keys[self.current_key])
-            return True
-        except Exception as e:
-            print(f"Failed to initialize client: {e}")
-            return False
-    
-    def rotate_key(self):
-        """Switch to next API key"""
-        self.current_key = (self.current_key + 1) % len(self.api_keys)
-        print(f"[*] Rotated to API key {self.current_key + 1}")
-        self.initialize_client()
-    
-    def get_response(self, messages, max_retries=3):
-        """Get response from Groq API with retry logic"""
-        from groq import Groq
-        
-        for attempt in range(max_retries):
-            try:
-                if not self.client:
-                    self.initialize_client()
-                
-                response = self.client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=messages,
-                    max_tokens=1000,
-                    temperature=0.7
-                )
-                return response.choices[0].message.content
-                
-            except Exception as e:
-                error_msg = str(e).lower()
-                if ("rate" in error_msg or "quota" in error_msg) and attempt < max_retries - 1:
-                    self.rotate_key()
-                    continue
-                else:
-                    return f"Error: {str(e)}"
-        
-        return "Error: All retries failed. Check your API keys."
+# Messages kept in memory per conversation (older ones are dropped)
+HISTORY_LIMIT = 50
 
-# ====================== TUX PERSONALITY ======================
-class TuxPersonality:
-    def __init__(self):
-        self.personality = {
-            "name": "Tux",
-            "title": "Senior MLOps Engineer",
-            "expertise": ["C++", "Rust", "Backend Architecture", "Docker", "Kubernetes", "CI/CD", "Deployments"],
-            "traits": ["blunt", "sarcastic", "technical", "funny", "honest"],
-            "greetings": [
-                "Another human. *sighs* What now?",
-                "Tux here. Try not to break production this time.",
-                "*checks watch* You've got 5 minutes before my next deployment.",
-                "Oh great, more questions. Let's make this quick."
-            ]
-        }
-    
-    def get_greeting(self):
-        import random
-        return random.choice(self.personality["greetings"])
-    
-    def enhance_response(self, response):
-        """Add Tux's personality to responses"""
-        import random
-        
-        enhancements = [
-            "\n\n*Tux adjusts his glasses*",
-            "\n\n*sighs* The truth is...",
-            "\n\nLet me be blunt:",
-            "\n\nHonestly?",
-            "\n\n*in a monotone voice*"
-        ]
-        
-        if random.random() > 0.5:
-            response = random.choice(enhancements) + " " + response
-        
-        # Add signature
-        signatures = [
-            "\n\n- Tux, your friendly neighborhood MLOps engineer",
-            "\n\n*deploys container and walks away*",
-            "\n\nNow if you'll excuse me, I have pipelines to monitor."
-        ]
-        
-        if random.random() > 0.7:
-            response += random.choice(signatures)
-        
-        return response
+# Transcript lines kept in the chat display (older ones are trimmed)
+TRANSCRIPT_MAX_LINES = 2000
+
+# Streamed chunks are batched into at most one redraw per frame
+FRAME_INTERVAL_MS = 33
+
+# Sender label colors, one text tag each
+SENDER_COLORS = {
+    "user": "#0004d3",
+    "bot": "#00b906",
+    "error": "#e90000"
+}
 
 # ====================== CHAT MANAGER ======================
 class ChatManager:
+    """GUI adapter over the shared TuxChatbot engine"""
+    
     def __init__(self):
-        self.client = GroqClient()
-        self.personality = TuxPersonality()
-        self.conversation_history = []
+        client = GroqClient(api_keys=[key for key in API_KEYS if key] or None)
+        self.chatbot = TuxChatbot(
+            client,
+            history=ConversationHistory(max_messages=HISTORY_LIMIT),
+            # Answers likely follow-ups while the user reads (TUX_PREFETCH=1)
+            prefetcher=default_prefetcher(client, knowledge=default_index())
+        )
+        self.client = self.chatbot.groq_client
+        self.personality = self.chatbot.personality
         self.stats = {
             "total_messages": 0,
-            "total_tokens": 0,
             "start_time": datetime.now()
         }
     
     def process_message(self, user_input):
         """Process user message and return Tux's response"""
         self.stats["total_messages"] += 1
-        
-        # Prepare messages
-        messages = [
-            {
-                "role": "system",
-                "content": f"""You are {self.personality.personality['name']}, a {self.personality.personality['title']}.
-Expertise: {', '.join(self.personality.personality['expertise'])}
-Personality: {', '.join(self.personality.personality['traits'])}
-
-Communication Style:
-1. Be brutally honest and blunt
-2. Use sarcasm and dry humor
-3. Focus on production-ready solutions
-4. Give practical, actionable advice
-5. Reference real-world MLOps experiences
-
-Example responses:
-- "*sighs* Let me be real with you..."
-- "That deployment strategy is giving me nightmares"
-- "Here's how we do it in production..."
-- "Not terrible. For a human."
-
-Always provide technical depth with practical insights."""
-            }
-        ]
-        
-        # Add conversation history (last 5 messages)
-        messages.extend(self.conversation_history[-5:])
-        messages.append({"role": "user", "content": user_input})
-        
-        # Get response
-        response = self.client.get_response(messages)
-        
-        # Add to history
-        self.conversation_history.append({"role": "user", "content": user_input})
-        self.conversation_history.append({"role": "assistant", "content": response})
-        
-        # Enhance with personality
-        enhanced_response = self.personality.enhance_response(response)
-        
-        return enhanced_response
+        return self.chatbot.process_query(user_input)
+    
+    def process_message_stream(self, user_input):
+        """Process user message and yield Tux's response as it arrives"""
+        self.stats["total_messages"] += 1
+        yield from self.chatbot.process_query_stream(user_input)
+    
+    def suggestions(self):
+        """Follow-up questions whose answers are being prefetched"""
+        prefetcher = self.chatbot.prefetcher
+        return prefetcher.suggestions if prefetcher else []
     
     def reset_conversation(self):
         """Reset conversation history"""
-        self.conversation_history = []
-        return "Conversation reset. Don't make me regret this."
+        return self.chatbot.reset_conversation()
     
     def get_stats(self):
         """Get chat statistics"""
         duration = datetime.now() - self.stats["start_time"]
+        metrics = self.client.metrics.get_summary()
         return {
             "total_messages": self.stats["total_messages"],
-            "conversation_length": len(self.conversation_history),
-            "duration_minutes": round(duration.total_seconds() / 60, 1)
+            "conversation_length": len(self.chatbot.conversation_history),
+            "duration_minutes": round(duration.total_seconds() / 60, 1),
+            "api_keys": len(self.client.api_keys),
+            "p50_ttft": metrics["p50_query_ttft"],
+            "p50_latency": metrics["p50_query_latency"]
         }
 
 # ====================== GUI APPLICATION ======================
@@ -206,10 +104,20 @@ class TuxApp:
         
         # Initialize chat manager
         self.chat_manager = ChatManager()
+        
+        # Worker threads queue updates and wake the UI thread with a virtual event
         self.message_queue = queue.Queue()
+        self.flush_lock = threading.Lock()
+        self.flush_pending = False
+        self.last_flush = 0.0
+        # Only a thread-enabled Tcl may be signalled from worker threads; otherwise poll
+        self.event_driven = self.root.tk.eval("info exists tcl_platform(threaded)") == "1"
         
         self.setup_ui()
-        self.check_queue()
+        self.root.bind("<<TuxUpdate>>", self.schedule_flush)
+        if not self.event_driven:
+            self.check_queue()
+        self.chat_manager.client.warmup()
         
         # Auto-greet
         self.root.after(1000, self.auto_greet)
@@ -244,6 +152,9 @@ class TuxApp:
             insertbackground="white"
         )
         self.chat_display.pack(fill=tk.BOTH, expand=True)
+        # Tags are configured once; every insert just names one
+        for msg_type, color in SENDER_COLORS.items():
+            self.chat_display.tag_config(f"sender_{msg_type}", foreground=color, font=("Arial", 11, "bold"))
         self.chat_display.config(state=tk.DISABLED)
         
         # Input Frame
@@ -267,7 +178,7 @@ class TuxApp:
     
     def auto_greet(self):
         """Auto-send greeting message"""
-        greeting = self.chat_manager.personality.get_greeting()
+        greeting = self.chat_manager.personality.get_response_frame("greeting")
         self.add_message("Tux", greeting, "bot")
     
     def send_message_on_enter(self, event):
@@ -293,50 +204,97 @@ class TuxApp:
         threading.Thread(target=self.process_in_background, args=(message,), daemon=True).start()
     
     def process_in_background(self, message):
-        """Process message in background thread"""
+        """Process message in background thread, streaming chunks to the UI"""
         try:
-            response = self.chat_manager.process_message(message)
-            self.message_queue.put(("response", response))
+            self.post("start", None)
+            for chunk in self.chat_manager.process_message_stream(message):
+                self.post("chunk", chunk)
+            self.post("end", None)
         except Exception as e:
-            self.message_queue.put(("error", str(e)))
+            self.post("end", None)
+            self.post("error", str(e))
     
-    def check_queue(self):
-        """Check for messages from background thread"""
+    def post(self, msg_type, content):
+        """Queue a display update from any thread"""
+        self.message_queue.put((msg_type, content))
+        if not self.event_driven:
+            return
+        with self.flush_lock:
+            if self.flush_pending:
+                return
+            self.flush_pending = True
+        try:
+            self.root.event_generate("<<TuxUpdate>>", when="tail")
+        except tk.TclError:
+            pass  # Window already closed
+    
+    def schedule_flush(self, event=None):
+        """Flush now, or at the next frame if the last flush was too recent"""
+        wait_ms = FRAME_INTERVAL_MS - int((time.monotonic() - self.last_flush) * 1000)
+        if wait_ms > 0:
+            self.root.after(wait_ms, self.flush_queue)
+        else:
+            self.flush_queue()
+    
+    def flush_queue(self):
+        """Render everything queued since the last frame in a single widget update"""
+        with self.flush_lock:
+            self.flush_pending = False
+        self.last_flush = time.monotonic()
+        
+        segments = []
+        status = None
         try:
             while True:
                 msg_type, content = self.message_queue.get_nowait()
-                if msg_type == "response":
-                    self.add_message(" Tux", content, "bot")
-                    self.status_bar.config(text="Ready")
+                if msg_type == "start":
+                    segments.append(("\n Tux: ", "sender_bot"))
+                    status = " Tux is typing..."
+                elif msg_type == "chunk":
+                    segments.append((content, ()))
+                elif msg_type == "end":
+                    segments.append(("\n", ()))
+                    suggestions = self.chat_manager.suggestions()
+                    status = "Ready" + (" | Next? " + " | ".join(suggestions) if suggestions else "")
                 elif msg_type == "error":
-                    self.add_message(" Error", content, "error")
-                    self.status_bar.config(text=" Error occurred")
+                    segments += [("\n Error: ", "sender_error"), (f"{content}\n", ())]
+                    status = " Error occurred"
         except queue.Empty:
             pass
         
-        self.root.after(100, self.check_queue)
+        if segments:
+            self.write(segments)
+        if status:
+            self.status_bar.config(text=status)
     
-    def add_message(self, sender, message, msg_type):
-        """Add message to chat display"""
+    def check_queue(self):
+        """Poll for updates from background threads (Tcl built without threads)"""
+        self.flush_queue()
+        self.root.after(FRAME_INTERVAL_MS, self.check_queue)
+    
+    def write(self, segments):
+        """Append (text, tag) segments to the transcript in one insert"""
+        # Follow the output only if the user hasn't scrolled up to read
+        at_bottom = self.chat_display.yview()[1] >= 0.999
+        
+        args = []
+        for text, tag in segments:
+            args += [text, tag]
         self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert(tk.END, *args)
         
-        # Add sender
-        if msg_type == "user":
-            color = "#0004d3"
-        elif msg_type == "bot":
-            color = "#00b906"
-        else:
-            color = "#e90000"
-        
-        self.chat_display.insert(tk.END, f"\n{sender}: ", f"sender_{msg_type}")
-        self.chat_display.tag_config(f"sender_{msg_type}", foreground=color, font=("Arial", 11, "bold"))
-        
-        # Add message
-        self.chat_display.insert(tk.END, f"{message}\n")
+        # Trim the oldest lines so the widget stays small in long sessions
+        lines = int(self.chat_display.index("end-1c").split(".")[0])
+        if lines > TRANSCRIPT_MAX_LINES:
+            self.chat_display.delete("1.0", f"{lines - TRANSCRIPT_MAX_LINES + 1}.0")
         
-        # Auto-scroll
-        self.chat_display.see(tk.END)
         self.chat_display.config(state=tk.DISABLED)
+        if at_bottom:
+            self.chat_display.see(tk.END)
+    
+    def add_message(self, sender, message, msg_type):
+        """Add message to chat display"""
+        self.write([(f"\n{sender}: ", f"sender_{msg_type}"), (f"{message}\n", ())])
     
     def reset_chat(self):
         """Reset the conversation"""
@@ -356,9 +314,10 @@ class TuxApp:
 • Total Messages: {stats['total_messages']}
 • Conversation Length: {stats['conversation_length']} messages
 • Duration: {stats['duration_minutes']} minutes
-• API Keys: {len(API_KEYS)} active keys
+• API Keys: {stats['api_keys']} active keys
+• Response Time: {stats['p50_ttft']:.2f}s to first token, {stats['p50_latency']:.2f}s total (median)
 • Expertise: C++, Rust, Docker, Kubernetes, CI/CD, Backend
-        
+
  MLOps Skills Demonstrated:
 ─────────────────────────
 • Multi-API Fallback System
@@ -372,20 +331,6 @@ class TuxApp:
 # ====================== MAIN ======================
 def main():
     try:
-        # Check for required packages
-        import subprocess
-        import importlib
-        
-        required = ['groq', 'tkinter']
-        for package in required:
-            if package == 'tkinter':
-                continue  # Usually comes with Python
-            try:
-                importlib.import_module(package)
-            except ImportError:
-                print(f"Installing {package}...")
-                subprocess.check_call([sys.executable, "-m", "pip", "install", package, "-q"])
-        
         # Create GUI
         root = tk.Tk()
         app = TuxApp(root)
@@ -399,7 +344,7 @@ def main():
         root.geometry(f'{width}x{height}+{x}+{y}')
         
         root.mainloop()
-        
+    
     except Exception as e:
         print(f"Error: {e}")
         input("Press Enter to exit...")
@@ -0,0 +1,143 @@
+"""
+Load Test for TuxChatbot Against the Local Mock Groq API
+
+Runs N concurrent simulated sessions, each asking a few questions, and reports
+throughput, time to first token and end-to-end latency percentiles along with
+the client's rotation/fallback/error counters.
+
+    python benchmarks/bench_chatbot.py --sessions 32 --turns 3 --rate-limit-rate 0.05
+
+Pass --base-url to drive an already running server (e.g. `python src/mock_groq_server.py`)
+instead of the in-process mock.
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from mock_groq_server import MockConfig, MockGroqServer
+
+QUESTIONS = [
+    "How do I set up a CI/CD pipeline for ML models?",
+    "What's the best way to monitor model drift in production?",
+    "How should I version datasets alongside model code?",
+    "Explain blue-green deployments for model serving.",
+    "How do I size GPU nodes for a Kubernetes inference cluster?"
+]
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def run_session(chatbot, session: int, turns: int, stream: bool, start: threading.Event) -> List[Tuple[float, Optional[float], bool]]:
+    """Play one conversation; returns (latency, ttft, ok) per turn"""
+    results = []
+    start.wait()
+    for turn in range(turns):
+        question = QUESTIONS[(session + turn) % len(QUESTIONS)]
+        started = time.perf_counter()
+        ttft = None
+        if stream:
+            response = ""
+            for token in chatbot.process_query_stream(question):
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                response += token
+        else:
+            response = chatbot.process_query(question)
+        latency = time.perf_counter() - started
+        ok = "*Tux facepalms* Something broke" not in response and "Even I'm speechless" not in response
+        results.append((latency, ttft, ok))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TuxChatbot against a mock Groq API")
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=3, help="questions per session")
+    parser.add_argument("--keys", type=int, default=3, help="number of fake API keys to rotate across")
+    parser.add_argument("--mode", choices=("stream", "query"), default="stream",
+                        help="process_query_stream (measures TTFT) or process_query")
+    parser.add_argument("--base-url", help="use a running mock/server instead of starting one")
+    parser.add_argument("--ttft", type=float, default=0.15)
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="probability a request stalls before its first token")
+    parser.add_argument("--stall", type=float, default=2.0, help="seconds a stalled request waits")
+    parser.add_argument("--chunk-interval", type=float, default=0.005)
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="probability of an injected 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected 500")
+    parser.add_argument("--rpm", type=int, default=0, help="per-key requests/minute enforced by the mock")
+    parser.add_argument("--tpm", type=int, default=0, help="per-key tokens/minute enforced by the mock")
+    parser.add_argument("--hedge", action="store_true", help="enable hedged requests (TUX_HEDGE=1)")
+    args = parser.parse_args()
+    
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = MockGroqServer(("127.0.0.1", 0), MockConfig(
+            ttft=args.ttft, stall_rate=args.stall_rate, stall=args.stall,
+            chunk_interval=args.chunk_interval, chunks=args.chunks,
+            rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+            requests_per_minute=args.rpm, tokens_per_minute=args.tpm
+        )).start()
+        base_url = server.base_url
+    
+    os.environ["GROQ_BASE_URL"] = base_url
+    for i in range(1, 10):
+        os.environ.pop(f"GROQ_API_KEY_{i}", None)
+    for i in range(1, args.keys + 1):
+        os.environ[f"GROQ_API_KEY_{i}"] = f"bench-key-{i}"
+    os.environ.setdefault("GROQ_MAX_CONCURRENCY_PER_KEY", str(args.sessions))
+    if args.rpm:
+        os.environ.setdefault("GROQ_REQUESTS_PER_MINUTE", str(args.rpm))
+    if args.tpm:
+        os.environ.setdefault("GROQ_TOKENS_PER_MINUTE", str(args.tpm))
+    if args.hedge:
+        os.environ["TUX_HEDGE"] = "1"
+    
+    from groq_client import GroqClient
+    from chatbot import TuxChatbot
+    logging.getLogger().setLevel(logging.CRITICAL)
+    
+    client = GroqClient()
+    start = threading.Event()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        futures = [
+            pool.submit(run_session, TuxChatbot(groq_client=client), session, args.turns, args.mode == "stream", start)
+            for session in range(args.sessions)
+        ]
+        started = time.perf_counter()
+        start.set()
+        results = [turn for future in futures for turn in future.result()]
+        elapsed = time.perf_counter() - started
+    
+    latencies = [latency for latency, _, ok in results if ok]
+    ttfts = [ttft for _, ttft, ok in results if ok and ttft is not None]
+    failed = sum(1 for _, _, ok in results if not ok)
+    summary = client.metrics.get_summary()
+    
+    print(f"Backend:     {base_url} ({args.keys} keys, mode={args.mode})")
+    print(f"Sessions:    {args.sessions} x {args.turns} turns = {len(results)} queries in {elapsed:.2f}s")
+    print(f"Throughput:  {len(latencies) / elapsed:.2f} queries/s ({failed} failed)")
+    if ttfts:
+        print(f"TTFT:        p50 {percentile(ttfts, 0.5) * 1000:.0f} ms   p99 {percentile(ttfts, 0.99) * 1000:.0f} ms")
+    print(f"Latency:     p50 {percentile(latencies, 0.5) * 1000:.0f} ms   p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    print(f"API calls:   {summary['total_api_calls']}   rotations {summary['key_rotations']}   "
+          f"fallback rate {summary['fallback_rate']:.1%}   error rate {summary['error_rate']:.1%}")
+    if args.hedge:
+        print(f"Hedging:     {summary['hedged_requests']} hedges, {summary['hedge_wins']} won")
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
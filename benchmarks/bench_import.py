@@ -0,0 +1,67 @@
+"""
+Cold-Start Benchmark for the CLI Entry Points
+
+Times `import chatbot` and `TuxChatbot()` in fresh interpreters and checks
+that the Groq SDK is not imported on the startup path. Exits non-zero when
+the median exceeds the budget, so it can gate CI.
+
+    python benchmarks/bench_import.py --runs 10 --max-ms 250
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import chatbot
+imported = time.perf_counter()
+chatbot.TuxChatbot()
+constructed = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "construct_ms": (constructed - imported) * 1000,
+    "groq_loaded": "groq" in sys.modules
+}))
+"""
+
+def run_probe() -> dict:
+    env = dict(os.environ, PYTHONPATH=SRC)
+    env.setdefault("GROQ_API_KEY_1", "bench-key")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chatbot cold start")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=250, help="budget for the median import + construct time")
+    args = parser.parse_args()
+    
+    runs = [run_probe() for _ in range(args.runs)]
+    imports = [r["import_ms"] for r in runs]
+    constructs = [r["construct_ms"] for r in runs]
+    totals = [i + c for i, c in zip(imports, constructs)]
+    
+    print(f"import chatbot:  median {statistics.median(imports):.1f} ms   max {max(imports):.1f} ms")
+    print(f"TuxChatbot():    median {statistics.median(constructs):.1f} ms   max {max(constructs):.1f} ms")
+    print(f"total:           median {statistics.median(totals):.1f} ms (budget {args.max_ms:.0f} ms)")
+    
+    failures = []
+    if any(r["groq_loaded"] for r in runs):
+        failures.append("the groq SDK was imported on the startup path")
+    if statistics.median(totals) > args.max_ms:
+        failures.append(f"median cold start {statistics.median(totals):.1f} ms exceeds {args.max_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
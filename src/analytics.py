@@ -0,0 +1,218 @@
+"""
+Conversation Analytics: Topic Extraction over Transcripts
+"""
+
+import os
+import re
+import json
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from transcripts import read_transcript
+
+logger = logging.getLogger(__name__)
+
+# Topic -> the words and spellings that count as a mention
+TOPIC_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "docker": ("docker", "dockerfile", "container", "containers", "containerize"),
+    "kubernetes": ("kubernetes", "k8s", "kubectl", "helm"),
+    "deployment": ("deployment", "deployments", "deploy", "deploying", "rollout", "rollback"),
+    "model": ("model", "models"),
+    "mlops": ("mlops",),
+    "ci/cd": ("ci/cd", "cicd", "ci", "pipeline", "pipelines"),
+    "rust": ("rust",),
+    "c++": ("c++", "cpp"),
+    "architecture": ("architecture", "microservices", "backend")
+}
+
+TRANSCRIPT_EXTENSIONS = (".json", ".jsonl", ".jsonl.gz", ".jsonl.zst", ".csv", ".csv.gz", ".parquet")
+
+class TopicMatcher:
+    """Find every topic keyword in a text with one compiled regex.
+    
+    All keywords of all topics are alternatives of a single pattern (longest
+    first) matched on word boundaries, so a message is scanned once however
+    many topics there are. Boundaries are lookarounds rather than \\b so
+    keywords like "c++" match too.
+    """
+    
+    def __init__(self, topics: Optional[Dict[str, Iterable[str]]] = None):
+        topics = topics or TOPIC_KEYWORDS
+        self.topic_of = {keyword.lower(): topic for topic, keywords in topics.items() for keyword in keywords}
+        alternatives = "|".join(re.escape(keyword) for keyword in sorted(self.topic_of, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)")
+    
+    def count(self, text: str) -> Counter:
+        """Mentions per topic"""
+        # One C-level lower() and a case-sensitive scan beat re.IGNORECASE about 2x
+        return Counter(self.topic_of[match] for match in self.pattern.findall(text.lower()))
+    
+    def topics(self, text: str) -> set:
+        return {self.topic_of[match] for match in self.pattern.findall(text.lower())}
+
+_matcher: Optional[TopicMatcher] = None
+
+def default_matcher() -> TopicMatcher:
+    global _matcher
+    if _matcher is None:
+        _matcher = TopicMatcher()
+    return _matcher
+
+class TopicStats:
+    """Mergeable topic counts over any number of sessions.
+    
+    Memory depends on the number of topics and days, not on the number of
+    sessions or messages, so months of logs fold into one small object and
+    results from parallel workers simply merge.
+    """
+    
+    def __init__(self):
+        self.sessions = 0
+        self.messages: Counter = Counter()          # role -> messages
+        self.mentions: Counter = Counter()          # topic -> keyword occurrences
+        self.topic_sessions: Counter = Counter()    # topic -> sessions mentioning it
+        self.daily: Counter = Counter()             # (YYYY-MM-DD, topic) -> occurrences
+    
+    def add_message(self, message: dict, day: Optional[str] = None, matcher: Optional[TopicMatcher] = None) -> Counter:
+        """Count one message; its own timestamp wins over `day`. Returns its topic counts"""
+        self.messages[message.get("role", "unknown")] += 1
+        counts = (matcher or default_matcher()).count(message.get("content") or "")
+        if counts:
+            self.mentions.update(counts)
+            day = _day(message.get("timestamp") or message.get("created_at")) or day
+            if day:
+                for topic, count in counts.items():
+                    self.daily[(day, topic)] += count
+        return counts
+    
+    def add_session(self, messages: Iterable[dict], day: Optional[str] = None, matcher: Optional[TopicMatcher] = None):
+        """Fold one whole conversation in"""
+        seen = set()
+        for message in messages:
+            seen.update(self.add_message(message, day, matcher))
+        self.close_sessions([seen])
+    
+    def close_sessions(self, session_topics: Iterable[set]):
+        """Count finished sessions, given the topics each one mentioned"""
+        for topics in session_topics:
+            self.sessions += 1
+            self.topic_sessions.update(topics)
+    
+    def merge(self, other: "TopicStats") -> "TopicStats":
+        self.sessions += other.sessions
+        self.messages.update(other.messages)
+        self.mentions.update(other.mentions)
+        self.topic_sessions.update(other.topic_sessions)
+        self.daily.update(other.daily)
+        return self
+    
+    def to_dict(self) -> dict:
+        daily: Dict[str, Dict[str, int]] = {}
+        for (day, topic), count in sorted(self.daily.items()):
+            daily.setdefault(day, {})[topic] = count
+        return {
+            "sessions": self.sessions,
+            "messages": dict(self.messages),
+            "topics": [
+                {"topic": topic, "mentions": mentions, "sessions": self.topic_sessions[topic]}
+                for topic, mentions in self.mentions.most_common()
+            ],
+            "daily": daily
+        }
+
+def _day(timestamp) -> Optional[str]:
+    """YYYY-MM-DD of an ISO-8601 string or a Unix timestamp"""
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, (int, float)):
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+    if isinstance(timestamp, str) and len(timestamp) >= 10 and timestamp[4] == "-":
+        return timestamp[:10]
+    return None
+
+def iter_records(path: str) -> Iterator[Tuple[str, Optional[str], object]]:
+    """Stream the conversations and messages of one transcript file.
+    
+    Yields ("session", day, messages) for ConversationExporter.export_to_json
+    files and JSONL lines holding a whole conversation ({"conversation" or
+    "messages": [...]}), and ("message", session_id, message) for JSONL with
+    one message per line ({"session_id", "role", "content"}), which is also
+    what the CSV and Parquet exports hold. Everything but the single-document
+    JSON is read a record at a time, compressed or not.
+    """
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            yield "session", _day(data.get("exported_at")), data.get("conversation") or data.get("messages") or []
+        elif isinstance(data, list):
+            yield "session", None, data
+        return
+    for record in read_transcript(path):
+        messages = record.get("conversation") or record.get("messages")
+        if isinstance(messages, list):
+            yield "session", _day(record.get("exported_at") or record.get("timestamp")), messages
+        elif "content" in record:
+            yield "message", str(record.get("session_id") or ""), record
+
+def analyze_file(path: str) -> TopicStats:
+    """Topic stats for one transcript file (runs in worker processes)"""
+    stats = TopicStats()
+    # Message-per-line files only keep each session's set of topics
+    session_topics: Dict[str, set] = {}
+    try:
+        for kind, key, payload in iter_records(path):
+            if kind == "session":
+                stats.add_session(payload, key)
+            else:
+                session_topics.setdefault(key, set()).update(stats.add_message(payload))
+    except (OSError, ValueError, ImportError) as e:
+        logger.warning(f"Skipping {path}: {e}")
+    stats.close_sessions(session_topics.values())
+    return stats
+
+def transcript_files(paths: Iterable[str]) -> Iterator[str]:
+    """Expand directories into the transcript files under them"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith(TRANSCRIPT_EXTENSIONS):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def analyze(paths: Iterable[str], workers: int = 1) -> TopicStats:
+    """Aggregate topic stats over transcript files, optionally across processes"""
+    files = transcript_files(paths)
+    total = TopicStats()
+    if workers <= 1:
+        for path in files:
+            total.merge(analyze_file(path))
+        return total
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for stats in pool.map(analyze_file, files):
+            total.merge(stats)
+    return total
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Topic analytics over exported Tux transcripts")
+    parser.add_argument("paths", nargs="+", help="transcript files (.json, .jsonl[.gz|.zst], .csv[.gz], .parquet) or directories of them")
+    parser.add_argument("--workers", type=int, default=1, help="parallel worker processes")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON (includes daily counts)")
+    args = parser.parse_args()
+    
+    stats = analyze(args.paths, args.workers)
+    if args.json:
+        print(json.dumps(stats.to_dict(), indent=2))
+        return
+    print(f"{stats.sessions} sessions, {sum(stats.messages.values())} messages")
+    for topic, mentions in stats.mentions.most_common():
+        print(f"  {topic:<14} {mentions:>8} mentions {stats.topic_sessions[topic]:>8} sessions")
+
+if __name__ == "__main__":
+    main()
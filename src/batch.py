@@ -0,0 +1,190 @@
+"""
+Batch Mode: Answer a JSONL File of Prompts Across All API Keys
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, Optional, Set, Tuple
+from groq_client import GroqClient
+from personality import TuxPersonality
+from prompts import SYSTEM_MESSAGE, context_message
+from retrieval import default_index
+from routing import QueryRouter
+
+logger = logging.getLogger(__name__)
+
+def read_prompts(path: str) -> Iterator[Tuple[int, Optional[str], str]]:
+    """Yield (index, id, prompt) for every line of the input.
+    
+    A line is either a JSON object with a "prompt" (or "question"/"message")
+    and an optional "id", a JSON string, or plain text.
+    """
+    with open(path, encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError:
+                item = line
+            if isinstance(item, dict):
+                prompt = item.get("prompt") or item.get("question") or item.get("message") or ""
+                item_id = item.get("id")
+                yield index, None if item_id is None else str(item_id), prompt
+            else:
+                yield index, None, str(item)
+
+def load_checkpoint(path: str) -> Set[int]:
+    """Indexes already answered in an existing output file.
+    
+    A torn last line from a crash is cut off so appends start on a clean line;
+    failed items are not counted and get retried.
+    """
+    done: Set[int] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if "error" not in record:
+            done.add(record["index"])
+    return done
+
+class BatchRunner:
+    """Run prompts concurrently through one shared GroqClient.
+    
+    The client's key scheduler spreads requests over every key within its
+    rate-limit budget, so throughput grows with the number of keys. Results
+    are appended to the output JSONL as they finish (or in input order with
+    `ordered`); the output doubles as the checkpoint for resuming.
+    """
+    
+    def __init__(self, groq_client: Optional[GroqClient] = None, workers: Optional[int] = None, ordered: bool = False, personality: bool = True):
+        self.groq_client = groq_client or GroqClient()
+        self.workers = workers or 4 * len(self.groq_client.api_keys)
+        self.ordered = ordered
+        self.personality = personality
+        # Items share no history, only the compiled system prompt
+        self.tux = TuxPersonality()
+        self.knowledge = default_index()
+        self.router = QueryRouter(self.groq_client)
+        self.fsync_interval = float(os.getenv("TUX_BATCH_FSYNC_INTERVAL", 5))
+    
+    def answer(self, index: int, item_id: Optional[str], prompt: str) -> Dict:
+        """Answer one prompt; failures are recorded rather than raised"""
+        record = {"index": index, "id": item_id, "prompt": prompt}
+        started = time.perf_counter()
+        try:
+            messages = [SYSTEM_MESSAGE.to_dict()]
+            snippets = self.knowledge.search(prompt) if self.knowledge else None
+            if snippets:
+                messages.append(context_message(snippets).to_dict())
+            messages.append({"role": "user", "content": prompt})
+            route = self.router.route(prompt)
+            response = self.groq_client.chat_completion(messages, model=route.model, max_tokens=route.max_tokens)
+            if response is None:
+                raise ValueError("Empty response")
+            if self.personality:
+                response = self.tux.add_personality_to_response(response)
+            record["response"] = response
+            record["tier"] = route.tier
+        except Exception as e:
+            record["error"] = str(e)
+        record["latency"] = round(time.perf_counter() - started, 3)
+        return record
+    
+    def run(self, input_path: str, output_path: str) -> Dict[str, int]:
+        done = load_checkpoint(output_path)
+        if done:
+            logger.info(f"Resuming: {len(done)} items already answered in {output_path}")
+        
+        stats = {"answered": 0, "failed": 0, "skipped": len(done)}
+        window = 2 * self.workers
+        submitted: "deque[Tuple[int, Future]]" = deque()
+        started = time.monotonic()
+        last_sync = started
+        
+        with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tux-batch") as pool:
+            def write(record: Dict):
+                nonlocal last_sync
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                # Flushed per line so a crashed process loses nothing already answered
+                out.flush()
+                if time.monotonic() - last_sync >= self.fsync_interval:
+                    os.fsync(out.fileno())
+                    last_sync = time.monotonic()
+                stats["failed" if "error" in record else "answered"] += 1
+                total = stats["answered"] + stats["failed"]
+                if total % 100 == 0:
+                    logger.info(f"{total} items done, {total / (time.monotonic() - started):.1f}/s")
+            
+            def drain(block: bool):
+                if self.ordered:
+                    if block:
+                        wait([submitted[0][1]])
+                    # Write the finished prefix of the submission order
+                    while submitted and submitted[0][1].done():
+                        write(submitted.popleft()[1].result())
+                else:
+                    if block:
+                        wait([future for _, future in submitted], return_when=FIRST_COMPLETED)
+                    for entry in [entry for entry in submitted if entry[1].done()]:
+                        submitted.remove(entry)
+                        write(entry[1].result())
+            
+            try:
+                for index, item_id, prompt in read_prompts(input_path):
+                    if index in done:
+                        continue
+                    while len(submitted) >= window:
+                        drain(block=True)
+                    submitted.append((index, pool.submit(self.answer, index, item_id, prompt)))
+                    drain(block=False)
+                while submitted:
+                    drain(block=True)
+            except KeyboardInterrupt:
+                logger.warning("Interrupted; answered items are saved, rerun to resume")
+                pool.shutdown(wait=True, cancel_futures=True)
+                for _, future in submitted:
+                    if future.done() and not future.cancelled():
+                        write(future.result())
+                raise
+            finally:
+                out.flush()
+                os.fsync(out.fileno())
+        return stats
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of prompts with Tux")
+    parser.add_argument("input", help="JSONL of prompts (objects with 'prompt' and optional 'id', or plain lines)")
+    parser.add_argument("-o", "--output", required=True, help="output JSONL; rerunning with the same file resumes")
+    parser.add_argument("--workers", type=int, help="concurrent requests (default: 4 per API key)")
+    parser.add_argument("--ordered", action="store_true", help="write results in input order")
+    parser.add_argument("--plain", action="store_true", help="skip Tux's personality flourishes")
+    args = parser.parse_args()
+    
+    runner = BatchRunner(workers=args.workers, ordered=args.ordered, personality=not args.plain)
+    try:
+        stats = runner.run(args.input, args.output)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(f"Answered {stats['answered']}, failed {stats['failed']}, skipped {stats['skipped']} already done")
+    sys.exit(1 if stats["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -3,77 +3,294 @@ Main Tux Chatbot Implementation
 """
 
 import os
+import time
+import asyncio
 import logging
-from typing import List, Dict
-from groq_client import GroqClient
+from concurrent.futures import Future
+from typing import AsyncIterator, Iterator, List, Dict, Optional
+from groq_client import GroqClient, AsyncGroqClient
 from personality import TuxPersonality
+from context_window import ContextWindow, count_tokens, MESSAGE_OVERHEAD_TOKENS
+from summarizer import ConversationSummarizer
+from history import ConversationHistory, Message
+from session_persistence import SessionJournal
+from prompts import SYSTEM_MESSAGE, PromptMessage, context_message, summary_message
+from retrieval import KnowledgeIndex, default_index
+from routing import QueryRouter, Route
+from prefetch import FollowUpPrefetcher, default_prefetcher
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class TuxChatbot:
-    def __init__(self):
-        self.groq_client = GroqClient()
+    def __init__(self, groq_client: Optional[GroqClient] = None, async_client: Optional[AsyncGroqClient] = None, history: Optional[ConversationHistory] = None, journal: Optional[SessionJournal] = None, knowledge: Optional[KnowledgeIndex] = None, router: Optional[QueryRouter] = None, prefetcher: Optional[FollowUpPrefetcher] = None):
+        # Clients can be shared between many chatbots (one per HTTP session)
+        self.groq_client = groq_client or GroqClient()
+        self.async_client = async_client
         self.personality = TuxPersonality()
-        self.conversation_history: List[Dict] = []
+        self.conversation_history = history if history is not None else ConversationHistory()
+        self.context = ContextWindow(reserve_tokens=self.groq_client.max_tokens)
         
-        # System prompt with enhanced personality for MLOps
-        self.system_prompt = f"""You are Tux, a senior MLOps/DevOps engineer with expertise in {', '.join(self.personality.personality['traits']['expertise'])}.
+        # Rolling summary of turns that were folded out of the history
+        self.summarizer = ConversationSummarizer(self.groq_client)
+        self.summary = ""
+        self._pending_summary: Optional[Future] = None
+        self._pending_fold_end: Optional[Message] = None
         
-        Your personality: {', '.join(self.personality.personality['traits']['communication'])}
+        # Persisted sessions are rehydrated lazily, on their first turn
+        self.journal = journal
+        self._rehydrated = journal is None
         
-        Communication style:
-        1. Be brutally honest and blunt
-        2. Use sarcasm and dry humor
-        3. Provide technical depth with practical insights
-        4. Focus on production-ready solutions
-        5. Reference real-world MLOps challenges
+        # Runbook/doc snippets for the current turn (TUX_KNOWLEDGE_DIR)
+        self.knowledge = knowledge if knowledge is not None else default_index()
+        self._context: Optional[PromptMessage] = None
         
-        When discussing:
-        - C++/Rust: Focus on performance, memory safety, and concurrency
-        - Backend Architecture: Emphasize scalability, observability, and fault tolerance
-        - Deployments: Discuss containerization, orchestration, and CI/CD
-        - MLOps: Highlight model versioning, monitoring, and infrastructure
+        # Model tier and answer budget for the current turn
+        self.router = router or QueryRouter(self.groq_client)
+        self._route: Optional[Route] = None
         
-        Always provide actionable, production-focused advice.
-        """
+        # Opt-in answers to likely follow-ups, computed while the user types
+        self.prefetcher = prefetcher
+        self._turn_input = ""
+        
+        # Compiled once per process and byte-stable across requests
+        self.system_message = SYSTEM_MESSAGE
+        self.system_prompt = SYSTEM_MESSAGE.content
+    
+    def _build_messages(self) -> List[Dict]:
+        """Prepare the message list sent to the model"""
+        prefix = [self.system_message]
+        if self.summary:
+            prefix.append(summary_message(self.summary))
+        if self._context:
+            prefix.append(self._context)
+        
+        # As much recent history as fits the token budget
+        return self.context.build(prefix, self.conversation_history)
+    
+    def _rehydrate(self):
+        """Restore a persisted session's summary and recent window"""
+        if self._rehydrated:
+            return
+        self._rehydrated = True
+        try:
+            summary, turns = self.journal.load(self.conversation_history.max_messages)
+        except Exception as e:
+            logger.warning(f"Failed to load persisted session {self.journal.session_id}: {e}")
+            return
+        self.summary = summary
+        # Restored turns keep the numbers they had, the newest being the journal's last
+        self.conversation_history.next_seq = max(self.conversation_history.next_seq, self.journal.seq - len(turns) + 1)
+        for role, content in turns:
+            self.conversation_history.append(role, content)
+    
+    def _retrieve(self, user_input: str) -> Optional[PromptMessage]:
+        """Knowledge snippets relevant to this turn, as a prompt message"""
+        if self.knowledge is None:
+            return None
+        try:
+            snippets = self.knowledge.search(user_input)
+        except Exception as e:
+            logger.warning(f"Knowledge search failed: {e}")
+            return None
+        return context_message(snippets) if snippets else None
+    
+    def _record(self, role: str, content: str, tokens: Optional[int] = None):
+        """Append a message to the history and the session journal"""
+        self.conversation_history.append(role, content).tokens = tokens
+        if self.journal:
+            self.journal.record(role, content)
+    
+    def _start_turn(self, user_input: str, retrieve: bool = True):
+        """Apply any finished background summary, then record the user's message"""
+        self._rehydrate()
+        future = self._pending_summary
+        if future is not None and future.done():
+            self._pending_summary = None
+            try:
+                self.summary = future.result()
+                # The summarized turns are now covered by the summary; release them
+                self.conversation_history.drop_through(self._pending_fold_end)
+                if self.journal:
+                    self.journal.record_summary(self.summary, len(self.conversation_history))
+            except Exception as e:
+                logger.warning(f"Conversation summarization failed: {e}")
+        
+        self._turn_input = user_input
+        self._route = self.router.route(user_input, len(self.conversation_history))
+        self._record("user", user_input)
+        self._context = self._retrieve(user_input) if retrieve else None
+    
+    def _prefetched(self, user_input: str) -> Optional[str]:
+        """A prefetched answer to this question, if it was predicted last turn"""
+        if self.prefetcher is None:
+            return None
+        return self.prefetcher.take(user_input)
+    
+    def _finish_turn(self, prefix: str, technical_response: str, suffix: str):
+        """Record Tux's answer, fold old turns into the summary and prefetch follow-ups in the background"""
+        response = prefix + technical_response + suffix
+        # Only the model's text needs counting; the personality pieces are precounted
+        tokens = count_tokens(technical_response) + self.personality.count_tokens(prefix) + self.personality.count_tokens(suffix) + MESSAGE_OVERHEAD_TOKENS
+        self._record("assistant", response, tokens)
+        
+        if self.prefetcher is not None:
+            prefix = [self.system_message, summary_message(self.summary)] if self.summary else [self.system_message]
+            self.prefetcher.schedule(self._turn_input, response, prefix, list(self.conversation_history))
+        
+        if self._pending_summary is None:
+            fold = self.summarizer.fold_count(len(self.conversation_history))
+            if fold:
+                turns = self.conversation_history.oldest(fold)
+                self._pending_fold_end = turns[-1]
+                self._pending_summary = self.summarizer.submit(self.summary, turns)
     
     def process_query(self, user_input: str) -> str:
         """Process user query and return Tux's response"""
+        turn_started = time.perf_counter()
         try:
             # Add to conversation history
-            self.conversation_history.append({"role": "user", "content": user_input})
-            
-            # Prepare messages
-            messages = [{"role": "system", "content": self.system_prompt}]
-            messages.extend(self.conversation_history[-10:])  # Keep last 10 messages
+            self._start_turn(user_input)
             
             # Get technical response
-            technical_response = self.groq_client.chat_completion(messages)
+            technical_response = self._prefetched(user_input) or self.groq_client.chat_completion(self._build_messages(), model=self._route.model, max_tokens=self._route.max_tokens)
             
             if not technical_response:
                 return "Even I'm speechless. Check your API keys maybe?"
             
             # Add personality
-            personality_response = self.personality.add_personality_to_response(technical_response)
+            prefix = self.personality.get_personality_prefix()
+            suffix = self.personality.get_personality_suffix(technical_response)
             
             # Add to history
-            self.conversation_history.append({"role": "assistant", "content": personality_response})
-            
-            return personality_response
+            self._finish_turn(prefix, technical_response, suffix)
+            self.groq_client.metrics.record_query(time.perf_counter() - turn_started)
             
+            return prefix + technical_response + suffix
+        
         except Exception as e:
             logger.error(f"Error processing query: {e}")
             return f"*Tux facepalms* Something broke: {str(e)}. Did you remember to docker-compose up?"
     
+    def process_query_stream(self, user_input: str) -> Iterator[str]:
+        """Process user query and yield Tux's response as it is generated"""
+        chunks: List[str] = []
+        turn_started = time.perf_counter()
+        ttft = None
+        try:
+            # Add to conversation history
+            self._start_turn(user_input)
+            
+            # Personality prefix goes out before the first token
+            prefix = self.personality.get_personality_prefix()
+            started = False
+            
+            prefetched = self._prefetched(user_input)
+            tokens = [prefetched] if prefetched else self.groq_client.chat_completion_stream(self._build_messages(), model=self._route.model, max_tokens=self._route.max_tokens)
+            for token in tokens:
+                if not started:
+                    started = True
+                    ttft = time.perf_counter() - turn_started
+                    if prefix:
+                        yield prefix
+                chunks.append(token)
+                yield token
+            
+            if not started:
+                yield "Even I'm speechless. Check your API keys maybe?"
+                return
+            
+            technical_response = "".join(chunks)
+            
+            # Personality suffix goes out after the last token
+            suffix = self.personality.get_personality_suffix(technical_response)
+            if suffix:
+                yield suffix
+            
+            # Add to history
+            self._finish_turn(prefix, technical_response, suffix)
+            self.groq_client.metrics.record_query(time.perf_counter() - turn_started, ttft)
+        
+        except Exception as e:
+            logger.error(f"Error processing query: {e}")
+            yield f"*Tux facepalms* Something broke: {str(e)}. Did you remember to docker-compose up?"
+    
+    async def aprocess_query_stream(self, user_input: str) -> AsyncIterator[str]:
+        """Async variant of process_query_stream for the HTTP server"""
+        if self.async_client is None:
+            sync = self.groq_client
+            self.async_client = AsyncGroqClient(cache=sync.cache, metrics=sync.metrics, api_keys=sync.api_keys, scheduler=sync.scheduler, breakers=sync.breakers)
+        
+        chunks: List[str] = []
+        turn_started = time.perf_counter()
+        ttft = None
+        try:
+            # Loading a persisted session touches disk; keep it off the event loop
+            if not self._rehydrated:
+                await asyncio.to_thread(self._rehydrate)
+            
+            # Add to conversation history
+            self._start_turn(user_input, retrieve=False)
+            # The index query is SQLite I/O; keep it off the event loop too
+            if self.knowledge is not None:
+                self._context = await asyncio.to_thread(self._retrieve, user_input)
+            
+            # Personality prefix goes out before the first token
+            prefix = self.personality.get_personality_prefix()
+            started = False
+            
+            async for token in self.async_client.chat_completion_stream(self._build_messages(), model=self._route.model, max_tokens=self._route.max_tokens):
+                if not started:
+                    started = True
+                    ttft = time.perf_counter() - turn_started
+                    if prefix:
+                        yield prefix
+                chunks.append(token)
+                yield token
+            
+            if not started:
+                yield "Even I'm speechless. Check your API keys maybe?"
+                return
+            
+            technical_response = "".join(chunks)
+            
+            # Personality suffix goes out after the last token
+            suffix = self.personality.get_personality_suffix(technical_response)
+            if suffix:
+                yield suffix
+            
+            # Add to history
+            self._finish_turn(prefix, technical_response, suffix)
+            self.async_client.metrics.record_query(time.perf_counter() - turn_started, ttft)
+        
+        except Exception as e:
+            logger.error(f"Error processing query: {e}")
+            yield f"*Tux facepalms* Something broke: {str(e)}. Did you remember to docker-compose up?"
+    
     def reset_conversation(self):
         """Reset conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
+        self.summary = ""
+        self._pending_summary = None
+        self._rehydrated = True
+        if self.prefetcher is not None:
+            self.prefetcher.clear()
+        if self.journal:
+            self.journal.record_reset()
         return "Conversation reset. Don't make me regret this."
 
 # CLI Interface
-def main():
-    chatbot = TuxChatbot()
+def main(api_keys: Optional[List[str]] = None):
+    """Interactive terminal chat; simple_tux.py and run.sh are thin wrappers around it"""
+    # Only warnings: INFO records (connection pool, HTTP requests) would land in the middle of streamed answers
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        groq_client = GroqClient(api_keys=api_keys)
+        chatbot = TuxChatbot(groq_client, prefetcher=default_prefetcher(groq_client, knowledge=default_index()))
+    except ValueError as e:
+        print(f"ERROR: {e}. Add your Groq API keys to .env (GROQ_API_KEY_1=...)")
+        raise SystemExit(1)
+    # Import the SDK and connect while the banner prints and the user types
+    chatbot.groq_client.warmup()
     
     print("\n" + "="*60)
     print("TUX: Senior MLOps Engineer Chatbot")
@@ -85,7 +302,10 @@ def main():
         try:
             user_input = input("You: ").strip()
             
-            if user_input.lower() == 'quit':
+            if not user_input:
+                continue
+            
+            if user_input.lower() in ('quit', 'exit', 'bye'):
                 print("\nTux: Finally. My containers miss me.")
                 break
             elif user_input.lower() == 'reset':
@@ -93,12 +313,19 @@ def main():
                 print("\nTux: Memory wiped. Don't repeat your mistakes.")
                 continue
             
-            response = chatbot.process_query(user_input)
-            print(f"\nTux: {response}\n")
-            
+            print("\nTux: ", end="", flush=True)
+            for token in chatbot.process_query_stream(user_input):
+                print(token, end="", flush=True)
+            print("\n")
+            if chatbot.prefetcher and chatbot.prefetcher.suggestions:
+                print("(Next? " + " | ".join(chatbot.prefetcher.suggestions) + ")\n")
+        
         except KeyboardInterrupt:
             print("\n\nTux: Interrupted? Typical.")
             break
+        except EOFError:
+            print("\n\nTux: EOF? Typical.")
+            break
         except Exception as e:
             print(f"\nTux: *segmentation fault* Error: {e}")
 
@@ -0,0 +1,102 @@
+"""
+Circuit Breakers and Retry Backoff for Model Fallback
+"""
+
+import os
+import time
+import random
+import threading
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter for the given (zero-based) retry attempt"""
+    base = base if base is not None else float(os.getenv("GROQ_RETRY_BACKOFF_BASE", 0.5))
+    cap = cap if cap is not None else float(os.getenv("GROQ_RETRY_BACKOFF_CAP", 8.0))
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open single probe -> closed.
+    
+    While open, callers skip the guarded model entirely instead of paying a
+    failed round-trip before falling back.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow_request(self) -> bool:
+        """Whether a request may go through; in half-open state only one probe at a time does"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                logger.info(f"Circuit {self.name} half-open, probing")
+            if self.probe_in_flight:
+                return False
+            self.probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+    
+    def release(self):
+        """Give back a half-open probe slot without judging the model (e.g. on a 429)"""
+        with self._lock:
+            self.probe_in_flight = False
+
+class BreakerRegistry:
+    """One circuit breaker per (API key, model) pair"""
+    
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold or int(os.getenv("GROQ_BREAKER_FAILURES", 3))
+        self.reset_timeout = reset_timeout or float(os.getenv("GROQ_BREAKER_RESET", 30))
+        self.clock = clock
+        self.breakers: Dict[Tuple[int, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key_index: int, model: str) -> CircuitBreaker:
+        breaker = self.breakers.get((key_index, model))
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.setdefault(
+                    (key_index, model),
+                    CircuitBreaker(f"key{key_index + 1}/{model}", self.failure_threshold, self.reset_timeout, self.clock)
+                )
+        return breaker
+    
+    def states(self) -> Dict[str, str]:
+        """Current state of every breaker, for health reporting"""
+        return {breaker.name: breaker.state for breaker in list(self.breakers.values())}
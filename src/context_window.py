@@ -0,0 +1,76 @@
+"""
+Token-Budgeted Context Window Manager
+"""
+
+import os
+import re
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Reversible, Sequence, Tuple, Union
+from history import Message
+
+if TYPE_CHECKING:
+    from prompts import PromptMessage
+
+# Words split into <=4 character pieces plus individual punctuation marks
+# track BPE token counts closely enough for budgeting, without a tokenizer dependency
+_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Per-message framing overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def count_tokens(text: str) -> int:
+    """Approximate the number of tokens in a piece of text"""
+    return len(_TOKEN_PATTERN.findall(text))
+
+class ContextWindow:
+    """Fill the prompt with history newest-first up to a token budget.
+    
+    The budget is the model context minus the room reserved for the completion
+    (MAX_TOKENS). Token counts are cached per message so a long-running session
+    only counts each message once.
+    """
+    
+    def __init__(self, context_tokens: Optional[int] = None, reserve_tokens: Optional[int] = None, cache_size: int = 4096):
+        self.context_tokens = context_tokens or int(os.getenv("TUX_CONTEXT_TOKENS", 8192))
+        self.reserve_tokens = reserve_tokens if reserve_tokens is not None else int(os.getenv("MAX_TOKENS", 4096))
+        self.cache_size = cache_size
+        self._counts: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+    
+    @property
+    def budget(self) -> int:
+        """Tokens available for the prompt"""
+        return max(0, self.context_tokens - self.reserve_tokens)
+    
+    def message_tokens(self, message: Union[Message, "PromptMessage", Dict]) -> int:
+        """Token count of one message including framing, memoized"""
+        if not isinstance(message, dict):
+            # History records and compiled prompt messages carry their own count
+            if message.tokens is None:
+                message.tokens = count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS
+            return message.tokens
+        
+        key = (message["role"], message["content"])
+        tokens = self._counts.get(key)
+        if tokens is None:
+            tokens = count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+            self._counts[key] = tokens
+            if len(self._counts) > self.cache_size:
+                self._counts.popitem(last=False)
+        return tokens
+    
+    def build(self, prefix: Sequence[Union["PromptMessage", Dict]], history: Reversible[Union[Message, Dict]]) -> List[Dict]:
+        """Return prefix + as much recent history as fits in the budget.
+        
+        The newest message is always included so the current question is never
+        dropped, even if it alone exceeds the budget.
+        """
+        remaining = self.budget - sum(self.message_tokens(m) for m in prefix)
+        selected: List[Dict] = []
+        for message in reversed(history):
+            tokens = self.message_tokens(message)
+            if tokens > remaining and selected:
+                break
+            selected.append(message if isinstance(message, dict) else message.to_dict())
+            remaining -= tokens
+        selected.reverse()
+        return [m if isinstance(m, dict) else m.to_dict() for m in prefix] + selected
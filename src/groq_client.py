@@ -3,91 +3,794 @@ Groq API Client with Fallback Mechanism
 """
 
 import os
-import random
-from typing import List, Optional
-from groq import Groq
-from dotenv import load_dotenv
+import time
+import asyncio
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 import logging
+from key_scheduler import KeyScheduler, KeysExhaustedError, estimate_prompt_tokens, is_rate_limit_error, error_headers
+from circuit_breaker import BreakerRegistry, CircuitBreaker, backoff_delay
+from hedging import HedgePolicy
+from response_cache import ResponseCache
+from single_flight import SingleFlight, AsyncSingleFlight, flight_key
+from http_pool import shared_http_client, new_async_http_client
+from utils import MetricsCollector
 
-load_dotenv()
+if TYPE_CHECKING:
+    from groq import Groq, AsyncGroq
 
 logger = logging.getLogger(__name__)
 
-class GroqClient:
-    def __init__(self):
-        self.api_keys = self._load_api_keys()
-        self.current_key_index = 0
-        self.clients = self._initialize_clients()
+T = TypeVar("T")
+
+def _load_api_keys(api_keys: Optional[List[str]] = None) -> List[str]:
+    """Load all API keys, from `api_keys` if given, else from the environment"""
+    if api_keys is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_keys = [os.getenv(f"GROQ_API_KEY_{i}") for i in range(1, 10)]  # Support up to 9 keys
+    
+    # Skip unset entries and the placeholders from the .env template
+    keys = [key for key in api_keys if key and not key.startswith("your_key_here")]
+    
+    if not keys:
+        raise ValueError("No GROQ API keys found in environment variables")
+    
+    logger.info(f"Loaded {len(keys)} API keys")
+    return keys
+
+def _default_client(key: str) -> "Groq":
+    """Groq SDK client for one key on the shared connection pool"""
+    # The SDK (and httpx/pydantic behind it) is imported on the first request, not at startup
+    from groq import Groq
+    # Retries are scheduled across keys here, not repeated on the same key by the SDK
+    return Groq(api_key=key, http_client=shared_http_client(), max_retries=0)
+
+class _UpstreamStream:
+    """An open completion stream, read up to its first token"""
+    
+    def __init__(self, key_index: int, model: str, started: float, stream):
+        self.key_index = key_index
+        self.model = model
+        self.started = started
+        self.stream = stream
+        self.usage = None
+        self._chunks = iter(stream)
+        self.first = self._next_token()
+    
+    def _next_token(self) -> Optional[str]:
+        for chunk in self._chunks:
+            # Groq reports usage on the final chunk
+            if chunk.x_groq and chunk.x_groq.usage:
+                self.usage = chunk.x_groq.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                return chunk.choices[0].delta.content
+        return None
+    
+    def __iter__(self) -> Iterator[str]:
+        token = self.first
+        while token:
+            yield token
+            token = self._next_token()
+    
+    def close(self):
+        self.stream.close()
+
+class _AsyncUpstreamStream:
+    """Async counterpart of _UpstreamStream that also holds the key's concurrency slot"""
+    
+    def __init__(self, key_index: int, model: str, started: float, stream, slot: asyncio.Semaphore):
+        self.key_index = key_index
+        self.model = model
+        self.started = started
+        self.stream = stream
+        self.usage = None
+        self.first: Optional[str] = None
+        self._chunks = stream.__aiter__()
+        self._slot = slot
+    
+    async def _next_token(self) -> Optional[str]:
+        async for chunk in self._chunks:
+            if chunk.x_groq and chunk.x_groq.usage:
+                self.usage = chunk.x_groq.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                return chunk.choices[0].delta.content
+        return None
+    
+    async def prime(self):
+        self.first = await self._next_token()
+    
+    async def __aiter__(self) -> AsyncIterator[str]:
+        token = self.first
+        while token:
+            yield token
+            token = await self._next_token()
+    
+    async def close(self):
+        if self._slot is None:
+            return
+        try:
+            await self.stream.close()
+        finally:
+            self._slot.release()
+            self._slot = None
+
+def _settle_loser(future: Future, key_index: int, discard: Callable[[int, Any], None]):
+    """Hand a hedge race's losing result, once it arrives, to `discard`"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        discard(key_index, future.result())
+    except Exception as e:
+        logger.debug(f"Discarding a losing hedged request failed: {e}")
+
+class _GroqClientBase:
+    """Configuration and the I/O-free parts of request handling shared by the sync and async clients.
+    
+    Keys come from GROQ_API_KEY_1..9 unless `api_keys` is given. A sync and
+    an async client on the same keys should share `scheduler` and
+    `breakers`, so rate budgets and circuit states see all of the traffic.
+    """
+    
+    def __init__(self, client_factory: Callable[[str], Any], cache: Optional[ResponseCache] = None, metrics: Optional[MetricsCollector] = None, api_keys: Optional[List[str]] = None, hedge: Optional[HedgePolicy] = None, scheduler: Optional[KeyScheduler] = None, breakers: Optional[BreakerRegistry] = None):
+        self.api_keys = _load_api_keys(api_keys)
+        self.client_factory = client_factory
+        self.clients: List[Any] = [None] * len(self.api_keys)
+        self.scheduler = scheduler or KeyScheduler(len(self.clients))
+        if len(self.scheduler.keys) != len(self.clients):
+            raise ValueError(f"Scheduler tracks {len(self.scheduler.keys)} API keys, client has {len(self.clients)}")
+        self.breakers = breakers or BreakerRegistry()
+        self.max_queue_wait = float(os.getenv("GROQ_MAX_QUEUE_WAIT", 30))
         self.model = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
         self.backup_model = os.getenv("GROQ_MODEL_BACKUP", "mixtral-8x7b-32768")
+        self.temperature = float(os.getenv("TEMPERATURE", 0.7))
+        self.max_tokens = int(os.getenv("MAX_TOKENS", 4096))
+        self.cache = cache or ResponseCache()
+        self.metrics = metrics or MetricsCollector()
+        self.coalesce = os.getenv("TUX_COALESCE", "1").lower() in ("1", "true", "yes")
+        self.hedge = hedge or HedgePolicy()
     
-    def _load_api_keys(self) -> List[str]:
-        """Load all API keys from environment"""
-        keys = []
-        for i in range(1, 10):  # Support up to 9 keys
-            key = os.getenv(f"GROQ_API_KEY_{i}")
-            if key:
-                keys.append(key)
+    def _cache_key(self, messages: List[dict], model: Optional[str] = None, max_tokens: Optional[int] = None) -> Optional[str]:
+        """Response cache key for a request, or None when the cache is bypassed"""
+        if not self.cache.enabled_for(self.temperature):
+            return None
+        return ResponseCache.make_key(model or self.model, messages, self.temperature, max_tokens or self.max_tokens)
+    
+    def _cached_response(self, cache_key: Optional[str]) -> Optional[str]:
+        """Look a request up in the response cache and count the hit or miss"""
+        if cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.metrics.record_cache_hit()
+        else:
+            self.metrics.record_cache_miss()
+        return cached
+    
+    def _reserve_key(self, estimated_tokens: int, exclude: Optional[int] = None) -> Tuple[int, float]:
+        """The key with the most rate-limit headroom and how long to wait before using it"""
+        return self.scheduler.acquire(
+            estimated_tokens,
+            exclude=() if exclude is None else (exclude,),
+            max_wait=self.max_queue_wait
+        )
+    
+    def _request(self, model: str, messages: List[dict], stream: bool, max_tokens: Optional[int]) -> Dict[str, Any]:
+        """Arguments of one chat completion request"""
+        return {
+            "model": model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or self.max_tokens,
+            "stream": stream
+        }
+    
+    def _record_failure(self, key_index: int, error: Exception):
+        """Feed a failed request back into the scheduler"""
+        if is_rate_limit_error(error):
+            self.scheduler.record_rate_limited(key_index, error_headers(error))
+    
+    def _models(self, model: Optional[str]) -> Tuple[str, ...]:
+        """Models to try on a key, in order.
         
-        if not keys:
-            raise ValueError("No GROQ API keys found in environment variables")
+        An explicit `model` (a routing tier, the summary model) is tried first,
+        with the primary/backup chain behind it.
+        """
+        return tuple(dict.fromkeys((model, self.model, self.backup_model) if model else (self.model, self.backup_model)))
+    
+    def _model_failed(self, breaker: CircuitBreaker, models: Tuple[str, ...], model: str, error: Exception):
+        """Judge a model after a failed request; a rate limit is re-raised instead.
         
-        logger.info(f"Loaded {len(keys)} API keys")
-        return keys
+        A 429 says nothing about model health and the key is now blocked, so
+        rather than spending a backup-model request on a key that is out of
+        budget, the caller's retry moves on to another key.
+        """
+        if is_rate_limit_error(error):
+            breaker.release()
+            raise error
+        breaker.record_failure()
+        if model != models[-1]:
+            logger.warning(f"Model {model} failed, trying {models[models.index(model) + 1]}")
     
-    def _initialize_clients(self) -> List[Groq]:
-        """Initialize Groq clients for all keys"""
-        clients = []
-        for key in self.api_keys:
+    def _model_answered(self, breaker: CircuitBreaker, models: Tuple[str, ...], model: str):
+        breaker.record_success()
+        if model != models[0]:
+            self.metrics.record_fallback()
+    
+    def _record_call(self, key_index: int, model: str, started: float, usage):
+        """Record latency and API-reported token usage of a finished completion"""
+        self.metrics.record_api_call(
+            usage.total_tokens if usage else 0,
+            time.perf_counter() - started,
+            key=str(key_index + 1),
+            model=model,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0
+        )
+    
+    def _record_first_token(self, model: Optional[str], model_used: str, started: float):
+        """Time to first token of a new stream, for metrics and the hedge policy"""
+        ttft = time.perf_counter() - started
+        self.metrics.record_ttft(model_used, ttft)
+        self.hedge.observe(model or self.model, True, ttft)
+    
+    def _settle(self, key_index: int, estimated_tokens: int, result):
+        """Account for a finished completion: metrics and the key's real token usage"""
+        model_used, response, started = result
+        self._record_call(key_index, model_used, started, response.usage)
+        if response.usage:
+            self.scheduler.record_usage(key_index, estimated_tokens, response.usage.total_tokens)
+    
+    def _acquire_hedge_key(self, estimated_tokens: int, exclude: int) -> Optional[int]:
+        """Reserve another key for a hedge if the hedge budget and that key's headroom allow it"""
+        if not self.hedge.try_acquire():
+            return None
+        try:
+            key_index, _ = self.scheduler.acquire(estimated_tokens, exclude=(exclude,), max_wait=0)
+        except KeysExhaustedError:
+            self.hedge.refund()
+            return None
+        self.metrics.record_hedge()
+        logger.info(f"Request on API key {exclude + 1} is slow, hedging on API key {key_index + 1}")
+        return key_index
+    
+    def _attempt_failed(self, attempt: int, max_retries: int, key_index: int, error: Exception):
+        """Log and count a failed attempt; raises if it was the last one"""
+        logger.error(f"Attempt {attempt + 1} failed on API key {key_index + 1}: {error}")
+        self.metrics.record_error()
+        if attempt >= max_retries - 1:
+            raise Exception(f"All retries failed. Last error: {error}")
+        self.metrics.record_rotation()
+
+class GroqClient(_GroqClientBase):
+    """Chat completions across rotated API keys.
+    
+    `client_factory` builds the per-key backend client from an API key and
+    defaults to a Groq SDK client on the connection pool shared by every key
+    (http_pool.py); GROQ_BASE_URL points the SDK at another endpoint (e.g. the
+    local mock in mock_groq_server.py). Clients are built on first use of
+    their key; `warmup()` opens a pooled connection in the background.
+    """
+    
+    def __init__(self, cache: Optional[ResponseCache] = None, metrics: Optional[MetricsCollector] = None, client_factory: Optional[Callable[[str], "Groq"]] = None, api_keys: Optional[List[str]] = None, hedge: Optional[HedgePolicy] = None, scheduler: Optional[KeyScheduler] = None, breakers: Optional[BreakerRegistry] = None):
+        super().__init__(client_factory or _default_client, cache, metrics, api_keys, hedge, scheduler, breakers)
+        self._clients_lock = threading.Lock()
+        self.flights = SingleFlight(on_join=self.metrics.record_coalesced)
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+    
+    def _client(self, key_index: int) -> "Groq":
+        """The client for a key, built on first use"""
+        client = self.clients[key_index]
+        if client is None:
+            with self._clients_lock:
+                client = self.clients[key_index]
+                if client is None:
+                    client = self.clients[key_index] = self.client_factory(self.api_keys[key_index])
+        return client
+    
+    def warmup(self) -> threading.Thread:
+        """Import the SDK and open a connection in the background, e.g. while the user types"""
+        thread = threading.Thread(target=self._warmup, name="groq-warmup", daemon=True)
+        thread.start()
+        return thread
+    
+    def _warmup(self):
+        try:
+            client = self._client(0)
+            # Any response will do, this only establishes the (TLS) connection
+            # in the pool that every key shares
+            client.get("/", cast_to=object)
+        except Exception as e:
+            logger.debug(f"Warmup request finished with: {e}")
+    
+    def _acquire_key(self, estimated_tokens: int, exclude: Optional[int] = None) -> int:
+        """Pick the key with the most rate-limit headroom, waiting if all are exhausted"""
+        key_index, wait = self._reserve_key(estimated_tokens, exclude)
+        if wait:
+            time.sleep(wait)
+        return key_index
+    
+    def _create_completion(self, key_index: int, model: str, messages: List[dict], stream: bool = False, max_tokens: Optional[int] = None):
+        """Issue a single chat completion request and record the rate-limit headers"""
+        try:
+            raw = self._client(key_index).chat.completions.with_raw_response.create(**self._request(model, messages, stream, max_tokens))
+        except Exception as e:
+            self._record_failure(key_index, e)
+            raise
+        self.scheduler.update_from_headers(key_index, raw.headers)
+        return raw.parse()
+    
+    def _complete_on_key(self, key_index: int, messages: List[dict], stream: bool = False, model: Optional[str] = None, max_tokens: Optional[int] = None):
+        """Try each model in turn on one key, skipping models whose circuit is open.
+        
+        Returns the model that answered along with the response.
+        """
+        models = self._models(model)
+        last_error: Optional[Exception] = None
+        for model in models:
+            breaker = self.breakers.get(key_index, model)
+            if not breaker.allow_request():
+                continue
             try:
-                client = Groq(api_key=key)
-                clients.append(client)
+                response = self._create_completion(key_index, model, messages, stream, max_tokens)
             except Exception as e:
-                logger.warning(f"Failed to initialize client for key: {e}")
-        return clients
+                self._model_failed(breaker, models, model, e)
+                last_error = e
+                continue
+            self._model_answered(breaker, models, model)
+            return model, response
+        raise last_error or Exception(f"All model circuits open on API key {key_index + 1}")
+    
+    def _before_retry(self, attempt: int, error: Exception):
+        """Back off before the next attempt unless the failure was a rate limit the scheduler routes around"""
+        if not is_rate_limit_error(error):
+            time.sleep(backoff_delay(attempt))
+    
+    def _hedged(self, call: Callable[[int], T], key_index: int, estimated_tokens: int, model: Optional[str], stream: bool, discard: Callable[[int, T], None]) -> Tuple[int, T]:
+        """Run `call` on a key and, if it has nothing after the hedge delay, race a copy on another key.
+        
+        Returns the key and result of whichever succeeds first. The sync SDK
+        can't abort a request in flight, so a losing result is handed to
+        `discard` once it arrives. Without TUX_HEDGE this is `call(key_index)`.
+        """
+        if not self.hedge.enabled or len(self.api_keys) < 2:
+            return key_index, call(key_index)
+        
+        self.hedge.record_request()
+        with self._clients_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("TUX_HEDGE_WORKERS", 64)), thread_name_prefix="tux-hedge")
+        primary = self._hedge_pool.submit(call, key_index)
+        try:
+            return key_index, primary.result(timeout=self.hedge.delay(model or self.model, stream))
+        except FutureTimeoutError:
+            pass
+        
+        hedge_index = self._acquire_hedge_key(estimated_tokens, key_index)
+        if hedge_index is None:
+            return key_index, primary.result()
+        owners: Dict[Future, int] = {primary: key_index, self._hedge_pool.submit(call, hedge_index): hedge_index}
+        error: Optional[BaseException] = None
+        for future in as_completed(owners):
+            error = future.exception()
+            if error is not None:
+                continue
+            for loser, loser_index in owners.items():
+                if loser is not future:
+                    loser.add_done_callback(lambda done, index=loser_index: _settle_loser(done, index, discard))
+            if future is not primary:
+                self.metrics.record_hedge_win()
+            return owners[future], future.result()
+        raise error
+    
+    def _complete(self, key_index: int, messages: List[dict], model: Optional[str], max_tokens: Optional[int]):
+        """A whole (non-streamed) completion on one key, timed for the hedge policy"""
+        started = time.perf_counter()
+        model_used, response = self._complete_on_key(key_index, messages, model=model, max_tokens=max_tokens)
+        self.hedge.observe(model or self.model, False, time.perf_counter() - started)
+        return model_used, response, started
+    
+    def _open_stream(self, key_index: int, messages: List[dict], model: Optional[str], max_tokens: Optional[int]) -> _UpstreamStream:
+        """Open a completion stream on one key and wait for its first token"""
+        started = time.perf_counter()
+        model_used, stream = self._complete_on_key(key_index, messages, stream=True, model=model, max_tokens=max_tokens)
+        try:
+            upstream = _UpstreamStream(key_index, model_used, started, stream)
+        except BaseException:
+            stream.close()
+            raise
+        if upstream.first:
+            self._record_first_token(model, model_used, started)
+        return upstream
     
-    def _rotate_key(self):
-        """Rotate to next API key"""
-        self.current_key_index = (self.current_key_index + 1) % len(self.clients)
-        logger.info(f"Rotated to API key {self.current_key_index + 1}")
+    def chat_completion(self, messages: List[dict], max_retries: int = 3, model: Optional[str] = None, max_tokens: Optional[int] = None) -> Optional[str]:
+        """Get chat completion with fallback mechanism.
+        
+        Concurrent identical requests share one upstream call unless TUX_COALESCE=0.
+        """
+        # None and an explicit MAX_TOKENS are the same request, for the cache and for coalescing
+        max_tokens = max_tokens or self.max_tokens
+        cache_key = self._cache_key(messages, model, max_tokens)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
+        if not self.coalesce:
+            return self._chat_completion(messages, cache_key, max_retries, model, max_tokens)
+        return self.flights.do(
+            flight_key(model, messages, self.temperature, max_tokens),
+            lambda: self._chat_completion(messages, cache_key, max_retries, model, max_tokens)
+        )
     
-    def chat_completion(self, messages: List[dict], max_retries: int = 3) -> Optional[str]:
-        """Get chat completion with fallback mechanism"""
+    def _chat_completion(self, messages: List[dict], cache_key: Optional[str], max_retries: int, model: Optional[str], max_tokens: Optional[int]) -> Optional[str]:
+        """One upstream completion, rotating keys between attempts"""
+        estimated_tokens = estimate_prompt_tokens(messages)
+        key_index = None
         for attempt in range(max_retries):
+            key_index = self._acquire_key(estimated_tokens, exclude=key_index)
             try:
-                client = self.clients[self.current_key_index]
+                key_index, result = self._hedged(
+                    lambda index: self._complete(index, messages, model, max_tokens),
+                    key_index, estimated_tokens, model, False,
+                    lambda index, loser: self._settle(index, estimated_tokens, loser)
+                )
+                self._settle(key_index, estimated_tokens, result)
                 
-                # Try primary model first
+                content = result[1].choices[0].message.content
+                if cache_key and content:
+                    self.cache.put(cache_key, content)
+                return content
+            
+            except Exception as e:
+                self._attempt_failed(attempt, max_retries, key_index, e)
+                self._before_retry(attempt, e)
+        
+        return None
+    
+    def chat_completion_stream(self, messages: List[dict], max_retries: int = 3, model: Optional[str] = None, max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Stream chat completion tokens as they arrive, with the same fallback mechanism.
+        
+        Retries and fallback only happen before the first token is yielded; once
+        output has reached the caller a failure is raised instead of silently
+        restarting the answer. Concurrent identical requests subscribe to one
+        upstream stream unless TUX_COALESCE=0.
+        """
+        # None and an explicit MAX_TOKENS are the same request, for the cache and for coalescing
+        max_tokens = max_tokens or self.max_tokens
+        cache_key = self._cache_key(messages, model, max_tokens)
+        cached = self._cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        if not self.coalesce:
+            yield from self._chat_completion_stream(messages, cache_key, max_retries, model, max_tokens)
+            return
+        yield from self.flights.stream(
+            flight_key(model, messages, self.temperature, max_tokens),
+            lambda: self._chat_completion_stream(messages, cache_key, max_retries, model, max_tokens)
+        )
+    
+    def _chat_completion_stream(self, messages: List[dict], cache_key: Optional[str], max_retries: int, model: Optional[str], max_tokens: Optional[int]) -> Iterator[str]:
+        """One upstream token stream, rotating keys between attempts until the first token"""
+        estimated_tokens = estimate_prompt_tokens(messages)
+        key_index = None
+        for attempt in range(max_retries):
+            key_index = self._acquire_key(estimated_tokens, exclude=key_index)
+            chunks: List[str] = []
+            try:
+                key_index, upstream = self._hedged(
+                    lambda index: self._open_stream(index, messages, model, max_tokens),
+                    key_index, estimated_tokens, model, True,
+                    lambda index, loser: loser.close()
+                )
                 try:
-                    response = client.chat.completions.create(
-                        model=self.model,
-                        messages=messages,
-                        temperature=float(os.getenv("TEMPERATURE", 0.7)),
-                        max_tokens=int(os.getenv("MAX_TOKENS", 4096))
-                    )
-                except Exception:
-                    # Fallback to backup model
-                    logger.warning(f"Primary model failed, trying backup: {self.backup_model}")
-                    response = client.chat.completions.create(
-                        model=self.backup_model,
-                        messages=messages,
-                        temperature=float(os.getenv("TEMPERATURE", 0.7)),
-                        max_tokens=int(os.getenv("MAX_TOKENS", 4096))
-                    )
-                
-                return response.choices[0].message.content
+                    for token in upstream:
+                        chunks.append(token)
+                        yield token
+                finally:
+                    # Release the pooled connection even if the consumer stopped early or closed the generator
+                    upstream.close()
                 
+                self._record_call(key_index, upstream.model, upstream.started, upstream.usage)
+                if cache_key and chunks:
+                    self.cache.put(cache_key, "".join(chunks))
+                return
+            
             except Exception as e:
-                logger.error(f"Attempt {attempt + 1} failed: {e}")
-                
-                if "rate limit" in str(e).lower() or "quota" in str(e).lower():
-                    self._rotate_key()
+                if chunks:
+                    raise
+                self._attempt_failed(attempt, max_retries, key_index, e)
+                self._before_retry(attempt, e)
+
+class AsyncGroqClient(_GroqClientBase):
+    """Asyncio-native Groq client with a bounded request pool per API key.
+    
+    All keys share one HTTP connection pool, so N concurrent sessions cost one
+    event loop and a handful of sockets instead of N blocked threads. Cancelling
+    the awaiting task aborts the in-flight request and frees its slot.
+    """
+    
+    def __init__(self, max_concurrency_per_key: Optional[int] = None, cache: Optional[ResponseCache] = None, metrics: Optional[MetricsCollector] = None, client_factory: Optional[Callable[[str], "AsyncGroq"]] = None, api_keys: Optional[List[str]] = None, hedge: Optional[HedgePolicy] = None, scheduler: Optional[KeyScheduler] = None, breakers: Optional[BreakerRegistry] = None):
+        super().__init__(client_factory or self._default_client, cache, metrics, api_keys, hedge, scheduler, breakers)
+        self.max_concurrency_per_key = max_concurrency_per_key or int(os.getenv("GROQ_MAX_CONCURRENCY_PER_KEY", 8))
+        self.http_client = None
+        self.semaphores = [asyncio.Semaphore(self.max_concurrency_per_key) for _ in self.clients]
+        self.flights = AsyncSingleFlight(on_join=self.metrics.record_coalesced)
+    
+    def _default_client(self, key: str) -> "AsyncGroq":
+        """Async Groq SDK client for one key on the shared connection pool"""
+        from groq import AsyncGroq
+        if self.http_client is None:
+            self.http_client = new_async_http_client()
+        return AsyncGroq(api_key=key, http_client=self.http_client, max_retries=0)
+    
+    def _client(self, key_index: int) -> "AsyncGroq":
+        """The client for a key, built on first use"""
+        client = self.clients[key_index]
+        if client is None:
+            client = self.clients[key_index] = self.client_factory(self.api_keys[key_index])
+        return client
+    
+    async def warmup(self):
+        """Import the SDK and open a pooled connection ahead of the first request"""
+        try:
+            # The import is the slow part; keep it off the event loop
+            await asyncio.to_thread(importlib.import_module, "groq")
+            client = self._client(0)
+            # Any response will do, this only establishes the (TLS) connection in the pool
+            await client.get("/", cast_to=object)
+        except Exception as e:
+            logger.debug(f"Warmup request finished with: {e}")
+    
+    async def _acached_response(self, cache_key: Optional[str]) -> Optional[str]:
+        """_cached_response, off the event loop when the lookup can reach the disk tier"""
+        if cache_key is None or self.cache.disk is None:
+            return self._cached_response(cache_key)
+        return await asyncio.to_thread(self._cached_response, cache_key)
+    
+    async def _cache_put(self, cache_key: str, value: str):
+        """Store a response, off the event loop when it is written to the disk tier"""
+        if self.cache.disk is None:
+            self.cache.put(cache_key, value)
+        else:
+            await asyncio.to_thread(self.cache.put, cache_key, value)
+    
+    async def _acquire_key(self, estimated_tokens: int, exclude: Optional[int] = None) -> int:
+        """Pick the key with the most rate-limit headroom, waiting if all are exhausted"""
+        key_index, wait = self._reserve_key(estimated_tokens, exclude)
+        if wait:
+            await asyncio.sleep(wait)
+        return key_index
+    
+    @asynccontextmanager
+    async def _slot(self, key_index: int):
+        """Hold one concurrency slot on a key for the duration of a request"""
+        async with self.semaphores[key_index]:
+            yield key_index
+    
+    async def _create_completion(self, key_index: int, model: str, messages: List[dict], stream: bool = False, max_tokens: Optional[int] = None):
+        """Issue a single chat completion request and record the rate-limit headers"""
+        try:
+            raw = await self._client(key_index).chat.completions.with_raw_response.create(**self._request(model, messages, stream, max_tokens))
+        except Exception as e:
+            self._record_failure(key_index, e)
+            raise
+        self.scheduler.update_from_headers(key_index, raw.headers)
+        return await raw.parse()
+    
+    async def _complete_on_key(self, key_index: int, messages: List[dict], stream: bool = False, model: Optional[str] = None, max_tokens: Optional[int] = None):
+        """Try each model in turn on one key, skipping models whose circuit is open.
+        
+        Returns the model that answered along with the response.
+        """
+        models = self._models(model)
+        last_error: Optional[Exception] = None
+        for model in models:
+            breaker = self.breakers.get(key_index, model)
+            if not breaker.allow_request():
+                continue
+            try:
+                response = await self._create_completion(key_index, model, messages, stream, max_tokens)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                self._model_failed(breaker, models, model, e)
+                last_error = e
+                continue
+            self._model_answered(breaker, models, model)
+            return model, response
+        raise last_error or Exception(f"All model circuits open on API key {key_index + 1}")
+    
+    async def _before_retry(self, attempt: int, error: Exception):
+        """Back off before the next attempt unless the failure was a rate limit the scheduler routes around"""
+        if not is_rate_limit_error(error):
+            await asyncio.sleep(backoff_delay(attempt))
+    
+    async def _hedged(self, call: Callable[[int], Awaitable[T]], key_index: int, estimated_tokens: int, model: Optional[str], stream: bool, discard: Callable[[int, T], Awaitable[None]]) -> Tuple[int, T]:
+        """Run `call` on a key and, if it has nothing after the hedge delay, race a copy on another key.
+        
+        Returns the key and result of whichever succeeds first; the other
+        request is cancelled, which aborts it and frees its slot.
+        """
+        if not self.hedge.enabled or len(self.api_keys) < 2:
+            return key_index, await call(key_index)
+        
+        self.hedge.record_request()
+        primary = asyncio.ensure_future(call(key_index))
+        owners: Dict[asyncio.Future, int] = {primary: key_index}
+        try:
+            done, _ = await asyncio.wait(owners, timeout=self.hedge.delay(model or self.model, stream))
+            if not done:
+                hedge_index = self._acquire_hedge_key(estimated_tokens, key_index)
+                if hedge_index is not None:
+                    owners[asyncio.ensure_future(call(hedge_index))] = hedge_index
+            
+            error: Optional[BaseException] = None
+            pending = set(owners)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if not winners:
+                    error = next(iter(done)).exception()
                     continue
+                # Both can finish in the same tick; keep one
+                for loser in winners[1:]:
+                    await discard(owners[loser], loser.result())
+                if winners[0] is not primary:
+                    self.metrics.record_hedge_win()
+                return owners[winners[0]], winners[0].result()
+            raise error
+        finally:
+            for task in owners:
+                task.cancel()
+    
+    async def _complete(self, key_index: int, messages: List[dict], model: Optional[str], max_tokens: Optional[int]):
+        """A whole (non-streamed) completion on one key, timed for the hedge policy"""
+        started = time.perf_counter()
+        async with self._slot(key_index):
+            model_used, response = await self._complete_on_key(key_index, messages, model=model, max_tokens=max_tokens)
+        self.hedge.observe(model or self.model, False, time.perf_counter() - started)
+        return model_used, response, started
+    
+    async def _discard_completion(self, key_index: int, estimated_tokens: int, result):
+        """A losing hedged completion still counts against its key"""
+        self._settle(key_index, estimated_tokens, result)
+    
+    async def _open_stream(self, key_index: int, messages: List[dict], model: Optional[str], max_tokens: Optional[int]) -> _AsyncUpstreamStream:
+        """Open a completion stream on one key and wait for its first token.
+        
+        The stream holds the key's concurrency slot until it is closed.
+        """
+        slot = self.semaphores[key_index]
+        await slot.acquire()
+        upstream = None
+        try:
+            started = time.perf_counter()
+            model_used, stream = await self._complete_on_key(key_index, messages, stream=True, model=model, max_tokens=max_tokens)
+            upstream = _AsyncUpstreamStream(key_index, model_used, started, stream, slot)
+            await upstream.prime()
+        except BaseException:
+            if upstream is not None:
+                await upstream.close()
+            else:
+                slot.release()
+            raise
+        if upstream.first:
+            self._record_first_token(model, model_used, started)
+        return upstream
+    
+    async def chat_completion(self, messages: List[dict], max_retries: int = 3, model: Optional[str] = None, max_tokens: Optional[int] = None) -> Optional[str]:
+        """Get chat completion with fallback mechanism.
+        
+        Concurrent identical requests share one upstream call unless TUX_COALESCE=0.
+        """
+        # None and an explicit MAX_TOKENS are the same request, for the cache and for coalescing
+        max_tokens = max_tokens or self.max_tokens
+        cache_key = self._cache_key(messages, model, max_tokens)
+        cached = await self._acached_response(cache_key)
+        if cached is not None:
+            return cached
+        
+        if not self.coalesce:
+            return await self._chat_completion(messages, cache_key, max_retries, model, max_tokens)
+        return await self.flights.do(
+            flight_key(model, messages, self.temperature, max_tokens),
+            lambda: self._chat_completion(messages, cache_key, max_retries, model, max_tokens)
+        )
+    
+    async def _chat_completion(self, messages: List[dict], cache_key: Optional[str], max_retries: int, model: Optional[str], max_tokens: Optional[int]) -> Optional[str]:
+        """One upstream completion, rotating keys between attempts"""
+        estimated_tokens = estimate_prompt_tokens(messages)
+        key_index = None
+        for attempt in range(max_retries):
+            key_index = await self._acquire_key(estimated_tokens, exclude=key_index)
+            try:
+                key_index, result = await self._hedged(
+                    lambda index: self._complete(index, messages, model, max_tokens),
+                    key_index, estimated_tokens, model, False,
+                    lambda index, loser: self._discard_completion(index, estimated_tokens, loser)
+                )
+                self._settle(key_index, estimated_tokens, result)
                 
-                if attempt < max_retries - 1:
-                    self._rotate_key()
-                    continue
-                else:
-                    raise Exception(f"All retries failed. Last error: {e}")
+                content = result[1].choices[0].message.content
+                if cache_key and content:
+                    await self._cache_put(cache_key, content)
+                return content
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._attempt_failed(attempt, max_retries, key_index, e)
+                await self._before_retry(attempt, e)
+        
+        return None
+    
+    async def chat_completion_stream(self, messages: List[dict], max_retries: int = 3, model: Optional[str] = None, max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Stream chat completion tokens as they arrive, with the same fallback mechanism.
+        
+        As with the sync client, retries only happen before the first token.
+        """
+        # None and an explicit MAX_TOKENS are the same request, for the cache and for coalescing
+        max_tokens = max_tokens or self.max_tokens
+        cache_key = self._cache_key(messages, model, max_tokens)
+        cached = await self._acached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
         
-        return None
\ No newline at end of file
+        if not self.coalesce:
+            subscription = self._chat_completion_stream(messages, cache_key, max_retries, model, max_tokens)
+        else:
+            subscription = self.flights.stream(
+                flight_key(model, messages, self.temperature, max_tokens),
+                lambda: self._chat_completion_stream(messages, cache_key, max_retries, model, max_tokens)
+            )
+        try:
+            async for token in subscription:
+                yield token
+        finally:
+            await subscription.aclose()
+    
+    async def _chat_completion_stream(self, messages: List[dict], cache_key: Optional[str], max_retries: int, model: Optional[str], max_tokens: Optional[int]) -> AsyncIterator[str]:
+        """One upstream token stream, rotating keys between attempts until the first token"""
+        estimated_tokens = estimate_prompt_tokens(messages)
+        key_index = None
+        for attempt in range(max_retries):
+            key_index = await self._acquire_key(estimated_tokens, exclude=key_index)
+            chunks: List[str] = []
+            try:
+                key_index, upstream = await self._hedged(
+                    lambda index: self._open_stream(index, messages, model, max_tokens),
+                    key_index, estimated_tokens, model, True,
+                    lambda index, loser: loser.close()
+                )
+                try:
+                    async for token in upstream:
+                        chunks.append(token)
+                        yield token
+                finally:
+                    # Release the connection and slot even if the consumer stopped early or was cancelled
+                    await upstream.close()
+                
+                self._record_call(key_index, upstream.model, upstream.started, upstream.usage)
+                if cache_key and chunks:
+                    await self._cache_put(cache_key, "".join(chunks))
+                return
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if chunks:
+                    raise
+                self._attempt_failed(attempt, max_retries, key_index, e)
+                await self._before_retry(attempt, e)
+    
+    async def aclose(self):
+        """Close the shared connection pool"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
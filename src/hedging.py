@@ -0,0 +1,68 @@
+"""
+Hedged Requests Against Tail Latency
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from utils import LatencyHistogram
+
+class HedgePolicy:
+    """Decide when a slow request gets a backup copy on another API key.
+    
+    The hedge delay is the observed `quantile` (p95 by default) of time to the
+    first token for the model, so only the slowest few percent of requests
+    are hedged; `initial_delay` applies until `min_samples` were observed.
+    A budget caps hedges at `max_rate` of all requests: every request earns
+    `max_rate` of a hedge, every hedge spends one, and at most `burst` can
+    be saved up.
+    
+    Disabled unless TUX_HEDGE=1.
+    """
+    
+    def __init__(self, enabled: Optional[bool] = None, quantile: Optional[float] = None, max_rate: Optional[float] = None, min_delay: Optional[float] = None, initial_delay: Optional[float] = None, min_samples: int = 20, burst: float = 10.0):
+        self.enabled = enabled if enabled is not None else os.getenv("TUX_HEDGE", "0").lower() in ("1", "true", "yes")
+        self.quantile = quantile or float(os.getenv("TUX_HEDGE_QUANTILE", 0.95))
+        self.max_rate = max_rate if max_rate is not None else float(os.getenv("TUX_HEDGE_MAX_RATE", 0.05))
+        self.min_delay = min_delay if min_delay is not None else float(os.getenv("TUX_HEDGE_MIN_DELAY", 0.1))
+        self.initial_delay = initial_delay if initial_delay is not None else float(os.getenv("TUX_HEDGE_INITIAL_DELAY", 2.0))
+        self.min_samples = min_samples
+        self.burst = burst
+        self.budget = 0.0
+        # Time to first token (streams) or to the whole answer, per (model, stream)
+        self._latency: Dict[Tuple[str, bool], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, model: str, stream: bool, seconds: float):
+        """Record how long a request on `model` took to produce its first token"""
+        with self._lock:
+            histogram = self._latency.get((model, stream))
+            if histogram is None:
+                histogram = self._latency[(model, stream)] = LatencyHistogram()
+            histogram.observe(seconds)
+    
+    def delay(self, model: str, stream: bool) -> float:
+        """Seconds to wait for the first token before sending a hedge"""
+        with self._lock:
+            histogram = self._latency.get((model, stream))
+            if histogram is None or histogram.count < self.min_samples:
+                return self.initial_delay
+            return max(self.min_delay, histogram.quantile(self.quantile))
+    
+    def record_request(self):
+        """Earn budget for one request that could be hedged"""
+        with self._lock:
+            self.budget = min(self.burst, self.budget + self.max_rate)
+    
+    def try_acquire(self) -> bool:
+        """Spend budget on one hedge, if there is enough"""
+        with self._lock:
+            if self.budget < 1:
+                return False
+            self.budget -= 1
+            return True
+    
+    def refund(self):
+        """Return budget for a hedge that could not be sent"""
+        with self._lock:
+            self.budget = min(self.burst, self.budget + 1)
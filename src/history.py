@@ -0,0 +1,104 @@
+"""
+Bounded, Compact Conversation History
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class Message:
+    """One conversation turn.
+    
+    Slots keep each record to a fixed, small size; role strings are interned so
+    every message shares the same "user"/"assistant" objects. `tokens` caches
+    the context window's token count for the content; `seq` is the message's
+    position in the whole conversation, which eviction never shifts.
+    """
+    
+    __slots__ = ("role", "content", "tokens", "seq")
+    
+    def __init__(self, role: str, content: str, seq: int = 0):
+        self.role = sys.intern(role)
+        self.content = content
+        self.tokens: Optional[int] = None
+        self.seq = seq
+    
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+    
+    def __repr__(self) -> str:
+        return f"Message({self.role!r}, {self.content[:40]!r})"
+
+class ConversationHistory:
+    """Ring buffer of Message records with a fixed capacity.
+    
+    When full, the oldest message is evicted; evicted (and explicitly dropped)
+    messages can be spilled to an append-only JSONL log so nothing is lost
+    while per-session memory stays predictable. Messages are numbered from
+    `next_seq` on, across evictions, folds and clears.
+    """
+    
+    def __init__(self, max_messages: Optional[int] = None, spill_path: Optional[str] = None):
+        self.max_messages = max_messages or int(os.getenv("TUX_HISTORY_MAX_MESSAGES", 64))
+        self.spill_path = spill_path
+        self._messages: "deque[Message]" = deque(maxlen=self.max_messages)
+        self.next_seq = 1
+    
+    def append(self, role: str, content: str) -> Message:
+        if len(self._messages) == self.max_messages:
+            self._spill([self._messages[0]])
+        message = Message(role, content, self.next_seq)
+        self.next_seq += 1
+        self._messages.append(message)
+        return message
+    
+    def oldest(self, count: int) -> List[Message]:
+        """The `count` oldest messages, oldest first"""
+        return [self._messages[i] for i in range(min(count, len(self._messages)))]
+    
+    def drop_through(self, message: Message):
+        """Release every message up to and including `message` (spilling them if configured)"""
+        if not any(m is message for m in self._messages):
+            return
+        dropped = []
+        while self._messages:
+            dropped.append(self._messages.popleft())
+            if dropped[-1] is message:
+                break
+        self._spill(dropped)
+    
+    def clear(self):
+        self._messages.clear()
+    
+    def to_dicts(self) -> List[Dict[str, str]]:
+        return [message.to_dict() for message in self._messages]
+    
+    def _spill(self, messages: List[Message]):
+        if not self.spill_path or not messages:
+            return
+        try:
+            directory = os.path.dirname(self.spill_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            now = time.time()
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write("".join(
+                    json.dumps({"role": m.role, "content": m.content, "spilled_at": now}) + "\n" for m in messages
+                ))
+        except OSError as e:
+            logger.warning(f"Failed to spill history to {self.spill_path}: {e}")
+    
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+    
+    def __reversed__(self) -> Iterator[Message]:
+        return reversed(self._messages)
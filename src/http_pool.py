@@ -0,0 +1,52 @@
+"""
+Shared HTTP Transport for All API Keys
+"""
+
+import os
+import threading
+import importlib.util
+import logging
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+_client: Optional["httpx.Client"] = None
+_client_lock = threading.Lock()
+
+def http2_enabled() -> bool:
+    """HTTP/2 unless GROQ_HTTP2=0, provided the optional h2 package is installed"""
+    if os.getenv("GROQ_HTTP2", "1").lower() not in ("1", "true", "yes"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+def pool_limits() -> "httpx.Limits":
+    """Connection pool limits from GROQ_HTTP_MAX_CONNECTIONS / _MAX_KEEPALIVE / _KEEPALIVE_EXPIRY"""
+    import httpx
+    return httpx.Limits(
+        max_connections=int(os.getenv("GROQ_HTTP_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(os.getenv("GROQ_HTTP_MAX_KEEPALIVE", 20)),
+        keepalive_expiry=float(os.getenv("GROQ_HTTP_KEEPALIVE_EXPIRY", 15))
+    )
+
+def shared_http_client() -> "httpx.Client":
+    """The process-wide keep-alive pool every sync Groq client sends through.
+
+    Clients for different keys differ only in the Authorization header they
+    add to each request, so rotating keys reuses open connections instead of
+    paying for a new TLS handshake.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            from groq import DefaultHttpxClient
+            _client = DefaultHttpxClient(limits=pool_limits(), http2=http2_enabled())
+            logger.info(f"Created shared HTTP pool (http2={http2_enabled()})")
+        return _client
+
+def new_async_http_client() -> "httpx.AsyncClient":
+    """A tuned async pool; async clients own theirs, since a pool is bound to its event loop"""
+    from groq import DefaultAsyncHttpxClient
+    return DefaultAsyncHttpxClient(limits=pool_limits(), http2=http2_enabled())
@@ -0,0 +1,226 @@
+"""
+Rate-Limit-Aware API Key Scheduler
+"""
+
+import os
+import re
+import time
+import threading
+import logging
+from typing import Callable, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse a rate-limit reset hint ("7.66s", "2m59.56s", "120ms", "3") into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+def estimate_prompt_tokens(messages: Iterable[dict]) -> int:
+    """Cheap prompt size estimate (~4 characters per token) used for budgeting"""
+    return sum(len(message.get("content") or "") for message in messages) // 4 + 1
+
+def _as_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an SDK exception is an HTTP 429"""
+    return getattr(error, "status_code", None) == 429
+
+def error_headers(error: Exception) -> Mapping[str, str]:
+    """Response headers attached to an SDK exception, if any"""
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) or {}
+
+class KeysExhaustedError(Exception):
+    """Every API key is rate limited for longer than the caller is willing to wait"""
+
+class TokenBucket:
+    """Bucket holding `capacity` units that refills continuously over one minute"""
+    
+    __slots__ = ("capacity", "level", "updated_at")
+    
+    def __init__(self, capacity: float, now: Optional[float] = None):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.updated_at = now if now is not None else time.monotonic()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.level = min(self.capacity, self.level + elapsed * self.capacity / 60.0)
+            self.updated_at = now
+    
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.level
+    
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+    
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available"""
+        deficit = min(amount, self.capacity) - self.available(now)
+        if deficit <= 0 or self.capacity <= 0:
+            return 0.0
+        return deficit * 60.0 / self.capacity
+    
+    def sync(self, remaining: float, now: float, limit: Optional[float] = None):
+        """Reconcile local state with the provider's view of the bucket"""
+        if limit:
+            self.capacity = float(limit)
+        self.level = min(self.capacity, float(remaining))
+        self.updated_at = now
+
+class KeyState:
+    """Request and token budgets for one API key.
+    
+    The budgets only hold requests back once `limited` is set; until then
+    they are still tracked (for headroom) but only cool-downs apply.
+    """
+    
+    __slots__ = ("requests", "tokens", "blocked_until", "limited")
+    
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, limited: bool = True, now: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute, now)
+        self.tokens = TokenBucket(tokens_per_minute, now)
+        self.blocked_until = 0.0
+        self.limited = limited
+    
+    def headroom(self, now: float) -> float:
+        """Fraction of the tighter of the two budgets still available"""
+        if now < self.blocked_until:
+            return 0.0
+        return max(0.0, min(
+            self.requests.available(now) / self.requests.capacity,
+            self.tokens.available(now) / self.tokens.capacity
+        ))
+    
+    def wait_time(self, estimated_tokens: int, now: float) -> float:
+        if not self.limited:
+            return max(self.blocked_until - now, 0.0)
+        return max(
+            self.blocked_until - now,
+            self.requests.time_until(1, now),
+            self.tokens.time_until(estimated_tokens, now),
+            0.0
+        )
+
+class KeyScheduler:
+    """Route each request to the API key with the most rate-limit headroom.
+    
+    Local token buckets (requests/min and tokens/min) predict exhaustion before
+    the provider has to answer with a 429. They are reconciled from the
+    x-ratelimit-* response headers and retry-after hints.
+    
+    With GROQ_REQUESTS_PER_MINUTE / GROQ_TOKENS_PER_MINUTE set (or passed in)
+    the buckets throttle from the first request. Otherwise the defaults (30
+    requests and 6000 tokens per minute, Groq's free tier) only throttle a key
+    once the provider has sent rate-limit headers for it, so an endpoint
+    without limits (a local mock, a proxy) is never slowed down.
+    """
+    
+    def __init__(self, num_keys: int, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        limited = bool(
+            requests_per_minute or tokens_per_minute
+            or os.getenv("GROQ_REQUESTS_PER_MINUTE") or os.getenv("GROQ_TOKENS_PER_MINUTE")
+        )
+        requests_per_minute = requests_per_minute or float(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))
+        tokens_per_minute = tokens_per_minute or float(os.getenv("GROQ_TOKENS_PER_MINUTE", 6000))
+        self.clock = clock
+        now = clock()
+        self.keys: List[KeyState] = [KeyState(requests_per_minute, tokens_per_minute, limited, now) for _ in range(num_keys)]
+        self._lock = threading.Lock()
+    
+    def acquire(self, estimated_tokens: int = 0, exclude: Iterable[int] = (), max_wait: Optional[float] = None) -> Tuple[int, float]:
+        """Reserve budget on the best key.
+        
+        Returns the key index and how many seconds the caller should wait before
+        sending, which is zero unless every key is currently exhausted. Raises
+        KeysExhaustedError instead of reserving if that wait exceeds `max_wait`.
+        """
+        excluded = set(exclude)
+        with self._lock:
+            now = self.clock()
+            candidates = [i for i in range(len(self.keys)) if i not in excluded] or list(range(len(self.keys)))
+            ready = [i for i in candidates if self.keys[i].wait_time(estimated_tokens, now) == 0]
+            if ready:
+                index = max(ready, key=lambda i: self.keys[i].headroom(now))
+                wait = 0.0
+            else:
+                index = min(candidates, key=lambda i: self.keys[i].wait_time(estimated_tokens, now))
+                wait = self.keys[index].wait_time(estimated_tokens, now)
+                if max_wait is not None and wait > max_wait:
+                    raise KeysExhaustedError(f"All API keys are rate limited for another {wait:.0f}s")
+            
+            state = self.keys[index]
+            state.requests.consume(1, now)
+            state.tokens.consume(estimated_tokens, now)
+        
+        if wait:
+            logger.info(f"All API keys exhausted, waiting {wait:.2f}s for key {index + 1}")
+        return index, wait
+    
+    def max_headroom(self) -> float:
+        """Headroom of the least loaded key (see KeyState.headroom)"""
+        with self._lock:
+            now = self.clock()
+            return max((state.headroom(now) for state in self.keys), default=0.0)
+    
+    def update_from_headers(self, index: int, headers: Mapping[str, str]):
+        """Reconcile a key's budgets from x-ratelimit-* and retry-after headers"""
+        with self._lock:
+            now = self.clock()
+            state = self.keys[index]
+            
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if not state.limited and (remaining_tokens is not None or headers.get("x-ratelimit-remaining-requests") is not None):
+                # The provider enforces limits on this key; start throttling locally,
+                # from full budgets rather than the debt run up while unthrottled
+                state.limited = True
+                state.requests.sync(state.requests.capacity, now)
+                state.tokens.sync(state.tokens.capacity, now)
+            if remaining_tokens is not None:
+                state.tokens.sync(float(remaining_tokens), now, _as_float(headers.get("x-ratelimit-limit-tokens")))
+            
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            if remaining_requests is not None and float(remaining_requests) <= 0:
+                # The request limit header is a daily quota; only trust it once it runs out
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                state.blocked_until = max(state.blocked_until, now + (reset or 60.0))
+            
+            retry_after = parse_duration(headers.get("retry-after"))
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+    
+    def record_rate_limited(self, index: int, headers: Optional[Mapping[str, str]] = None):
+        """Take a key out of rotation after an unexpected 429"""
+        headers = headers or {}
+        self.update_from_headers(index, headers)
+        with self._lock:
+            now = self.clock()
+            state = self.keys[index]
+            retry_after = parse_duration(headers.get("retry-after")) or parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            state.blocked_until = max(state.blocked_until, now + (retry_after or 60.0))
+        logger.warning(f"API key {index + 1} rate limited, cooling down")
+    
+    def record_usage(self, index: int, estimated_tokens: int, actual_tokens: int):
+        """Correct a reservation once the real token usage is known"""
+        with self._lock:
+            self.keys[index].tokens.consume(actual_tokens - estimated_tokens, self.clock())
@@ -0,0 +1,231 @@
+"""
+Local Stand-In for the Groq Chat Completions API
+
+Point the clients at it with GROQ_BASE_URL=http://127.0.0.1:<port> to measure
+throughput and latency without spending real quota.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+import logging
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock backend"""
+    ttft: float = 0.15               # seconds before the first token / the response headers
+    ttft_jitter: float = 0.05        # uniform +/- jitter on ttft
+    stall_rate: float = 0.0          # probability a request stalls before its first token
+    stall: float = 2.0               # extra seconds a stalled request waits
+    chunk_interval: float = 0.01     # seconds between streamed chunks
+    chunks: int = 40                 # completion length in chunks (~1 token each)
+    rate_limit_rate: float = 0.0     # probability of an injected 429
+    error_rate: float = 0.0          # probability of an injected 500
+    requests_per_minute: int = 0     # per-key request limit enforced with real 429s, 0 = unlimited
+    tokens_per_minute: int = 0       # per-key token limit enforced with real 429s, 0 = unlimited
+    
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        return cls(
+            ttft=float(os.getenv("MOCK_GROQ_TTFT", cls.ttft)),
+            ttft_jitter=float(os.getenv("MOCK_GROQ_TTFT_JITTER", cls.ttft_jitter)),
+            stall_rate=float(os.getenv("MOCK_GROQ_STALL_RATE", cls.stall_rate)),
+            stall=float(os.getenv("MOCK_GROQ_STALL", cls.stall)),
+            chunk_interval=float(os.getenv("MOCK_GROQ_CHUNK_INTERVAL", cls.chunk_interval)),
+            chunks=int(os.getenv("MOCK_GROQ_CHUNKS", cls.chunks)),
+            rate_limit_rate=float(os.getenv("MOCK_GROQ_429_RATE", cls.rate_limit_rate)),
+            error_rate=float(os.getenv("MOCK_GROQ_ERROR_RATE", cls.error_rate)),
+            requests_per_minute=int(os.getenv("MOCK_GROQ_RPM", cls.requests_per_minute)),
+            tokens_per_minute=int(os.getenv("MOCK_GROQ_TPM", cls.tokens_per_minute))
+        )
+
+class _KeyLimits:
+    """Sliding one-minute window of requests and tokens for one API key"""
+    
+    def __init__(self):
+        self.events = []  # (timestamp, tokens)
+    
+    def check(self, config: MockConfig, tokens: int, now: float) -> Tuple[bool, Dict[str, str]]:
+        self.events = [(t, n) for t, n in self.events if now - t < 60]
+        used_requests = len(self.events)
+        used_tokens = sum(n for _, n in self.events)
+        allowed = (
+            (not config.requests_per_minute or used_requests < config.requests_per_minute)
+            and (not config.tokens_per_minute or used_tokens + tokens <= config.tokens_per_minute)
+        )
+        if allowed:
+            self.events.append((now, tokens))
+            used_requests += 1
+            used_tokens += tokens
+        reset = 60 - (now - self.events[0][0]) if self.events else 0.0
+        headers = {}
+        if config.requests_per_minute:
+            headers["x-ratelimit-limit-requests"] = str(config.requests_per_minute)
+            headers["x-ratelimit-remaining-requests"] = str(max(0, config.requests_per_minute - used_requests))
+            headers["x-ratelimit-reset-requests"] = f"{reset:.2f}s"
+        if config.tokens_per_minute:
+            headers["x-ratelimit-limit-tokens"] = str(config.tokens_per_minute)
+            headers["x-ratelimit-remaining-tokens"] = str(max(0, config.tokens_per_minute - used_tokens))
+            headers["x-ratelimit-reset-tokens"] = f"{reset:.2f}s"
+        if not allowed:
+            headers["retry-after"] = f"{max(reset, 0.1):.2f}"
+        return allowed, headers
+
+class MockGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def __init__(self, address: Tuple[str, int], config: Optional[MockConfig] = None):
+        super().__init__(address, _Handler)
+        self.config = config or MockConfig()
+        self.limits: Dict[str, _KeyLimits] = {}
+        self.lock = threading.Lock()
+        self.requests_served = 0
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self) -> "MockGroqServer":
+        """Serve from a daemon thread"""
+        threading.Thread(target=self.serve_forever, name="mock-groq", daemon=True).start()
+        return self
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockGroqServer
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.rstrip("/") != COMPLETIONS_PATH:
+            return self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+        
+        request = json.loads(body or b"{}")
+        config = self.server.config
+        key = self.headers.get("Authorization", "")
+        prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4 + 1
+        completion_tokens = min(config.chunks, int(request.get("max_tokens") or config.chunks))
+        
+        with self.server.lock:
+            limits = self.server.limits.setdefault(key, _KeyLimits())
+            allowed, headers = limits.check(config, prompt_tokens + completion_tokens, time.monotonic())
+        
+        if not allowed or random.random() < config.rate_limit_rate:
+            headers.setdefault("retry-after", "1")
+            return self._json(429, {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}}, headers)
+        
+        time.sleep(max(0.0, config.ttft + random.uniform(-config.ttft_jitter, config.ttft_jitter)))
+        if random.random() < config.stall_rate:
+            time.sleep(config.stall)
+        
+        if random.random() < config.error_rate:
+            return self._json(500, {"error": {"message": "Injected upstream failure", "type": "internal_server_error"}}, headers)
+        
+        with self.server.lock:
+            self.server.requests_served += 1
+        
+        model = request.get("model", "mock-model")
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        words = [f"tok{i} " for i in range(completion_tokens)]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        
+        if not request.get("stream"):
+            time.sleep(config.chunk_interval * completion_tokens)
+            return self._json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop", "logprobs": None}],
+                "usage": usage
+            }, headers)
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        
+        def event(delta: dict, finish_reason=None, x_groq=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}]
+            }
+            if x_groq:
+                chunk["x_groq"] = x_groq
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        
+        try:
+            event({"role": "assistant", "content": ""})
+            for word in words:
+                event({"content": word})
+                time.sleep(config.chunk_interval)
+            event({}, finish_reason="stop", x_groq={"id": completion_id, "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the stream
+            pass
+        self.close_connection = True
+    
+    def _json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+def main():
+    config = MockConfig.from_env()
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--ttft", type=float, default=config.ttft)
+    parser.add_argument("--stall-rate", type=float, default=config.stall_rate)
+    parser.add_argument("--stall", type=float, default=config.stall)
+    parser.add_argument("--chunk-interval", type=float, default=config.chunk_interval)
+    parser.add_argument("--chunks", type=int, default=config.chunks)
+    parser.add_argument("--rate-limit-rate", type=float, default=config.rate_limit_rate)
+    parser.add_argument("--error-rate", type=float, default=config.error_rate)
+    parser.add_argument("--rpm", type=int, default=config.requests_per_minute)
+    parser.add_argument("--tpm", type=int, default=config.tokens_per_minute)
+    args = parser.parse_args()
+    
+    config = MockConfig(
+        ttft=args.ttft, ttft_jitter=config.ttft_jitter, stall_rate=args.stall_rate, stall=args.stall,
+        chunk_interval=args.chunk_interval, chunks=args.chunks,
+        rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+        requests_per_minute=args.rpm, tokens_per_minute=args.tpm
+    )
+    server = MockGroqServer((args.host, args.port), config)
+    print(f"Mock Groq API listening on {server.base_url} (export GROQ_BASE_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@
 Tux Personality Module - Enhanced for MLOps Portfolio
 """
 
+import random
+from typing import Dict
+from context_window import count_tokens
+
 TUX_PERSONALITY = {
     "name": "Tux",
     "role": "Senior DevOps/MLEngineer turned brutally honest mentor",
@@ -46,6 +50,27 @@ TUX_PERSONALITY = {
     ]
 }
 
+# Personality variants, precomputed with their separators
+PERSONALITY_PREFIXES = (
+    "\n\n*Tux adjusts his glasses* ",
+    "\n\n*in a monotone, unimpressed voice* ",
+    "\n\n*sighs* Look, here's the deal: ",
+    "\n\nHonestly? ",
+    "\n\nLet me be real with you: "
+)
+CATCHPHRASE_SUFFIXES = tuple("\n\n" + phrase for phrase in TUX_PERSONALITY["traits"]["catchphrases"])
+INSIGHT_SUFFIXES = tuple("\n\n" + insight for insight in TUX_PERSONALITY["mlops_insights"])
+
+# Token counts of every prefix and suffix get_personality_* can return; the
+# pieces start or end on whitespace, so counts add up across concatenation
+PERSONALITY_TOKENS: Dict[str, int] = {
+    text: count_tokens(text)
+    for text in (
+        "", *PERSONALITY_PREFIXES, *CATCHPHRASE_SUFFIXES, *INSIGHT_SUFFIXES,
+        *(phrase + insight for phrase in CATCHPHRASE_SUFFIXES for insight in INSIGHT_SUFFIXES)
+    )
+}
+
 class TuxPersonality:
     def __init__(self):
         self.personality = TUX_PERSONALITY
@@ -53,36 +78,37 @@ class TuxPersonality:
     
     def get_response_frame(self, category):
         """Get a response frame based on category"""
-        import random
         if category in self.personality["responses"]:
             return random.choice(self.personality["responses"][category])
         return random.choice(self.personality["responses"]["technical"])
     
-    def add_personality_to_response(self, technical_response):
-        """Inject Tux's personality into technical responses"""
-        import random
-        
-        # Personality injections
-        injections = [
-            "\n\n*Tux adjusts his glasses* ",
-            "\n\n*in a monotone, unimpressed voice* ",
-            "\n\n*sighs* Look, here's the deal: ",
-            "\n\nHonestly? ",
-            "\n\nLet me be real with you: "
-        ]
-        
+    def get_personality_prefix(self):
+        """Pick the personality injection that goes before the technical response"""
         # Random personality injection
         if random.random() > 0.5:
-            response = random.choice(injections) + technical_response
-        else:
-            response = technical_response
+            return random.choice(PERSONALITY_PREFIXES)
+        return ""
+    
+    def get_personality_suffix(self, technical_response):
+        """Pick the catchphrase/insight that goes after the full technical response"""
+        suffix = ""
         
         # Add catchphrase sometimes
         if random.random() > 0.7:
-            response += "\n\n" + random.choice(self.personality["traits"]["catchphrases"])
+            suffix += random.choice(CATCHPHRASE_SUFFIXES)
         
         # Add MLOps insight occasionally
         if random.random() > 0.8 and "deploy" in technical_response.lower():
-            response += "\n\n" + random.choice(self.personality["mlops_insights"])
+            suffix += random.choice(INSIGHT_SUFFIXES)
         
-        return response
\ No newline at end of file
+        return suffix
+    
+    def count_tokens(self, text):
+        """Token count of a personality prefix or suffix, precomputed"""
+        tokens = PERSONALITY_TOKENS.get(text)
+        return tokens if tokens is not None else count_tokens(text)
+    
+    def add_personality_to_response(self, technical_response):
+        """Inject Tux's personality into technical responses"""
+        prefix = self.get_personality_prefix()
+        return prefix + technical_response + self.get_personality_suffix(technical_response)
\ No newline at end of file
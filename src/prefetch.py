@@ -0,0 +1,200 @@
+"""
+Speculative Prefetch of Likely Follow-Up Answers
+"""
+
+import os
+import re
+import time
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from analytics import default_matcher
+from context_window import ContextWindow
+from history import Message
+from prompts import PromptMessage, context_message
+from retrieval import KnowledgeIndex
+from routing import QueryRouter
+from utils import background_executor
+
+logger = logging.getLogger(__name__)
+
+# Questions users most often ask next, per analytics topic
+FOLLOW_UPS: Dict[str, Tuple[str, ...]] = {
+    "docker": ("How do I make the Docker image smaller?", "How do I debug a container that keeps restarting?"),
+    "kubernetes": ("How do I roll back a bad deployment in Kubernetes?", "How do I autoscale this on Kubernetes?"),
+    "deployment": ("How do I roll back if the deployment fails?", "How do I do a canary release?"),
+    "model": ("How do I monitor the model in production?", "How do I version models?"),
+    "mlops": ("What tools should I use for an MLOps stack?", "How do I monitor the model in production?"),
+    "ci/cd": ("How do I add tests to the CI/CD pipeline?", "How do I deploy automatically from CI/CD?"),
+    "rust": ("How do I handle errors in Rust?", "How do I make this Rust code faster?"),
+    "c++": ("How do I avoid memory leaks in C++?", "How do I profile C++ code?"),
+    "architecture": ("How do I scale this architecture?", "Monolith or microservices for this?")
+}
+
+SUGGEST_PROMPT = (
+    "Given a question and the answer it got, write the {count} follow-up questions the "
+    "user is most likely to ask next. One short question per line, nothing else."
+)
+
+_STOP_WORDS = frozenset(("a", "an", "the", "i", "do", "does", "is", "are", "to", "in", "on", "of", "for", "this", "it", "my", "me", "can", "you", "how", "what", "should"))
+_WORD = re.compile(r"[\w+#/]+")
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by every session's prefetcher"""
+    return background_executor("prefetch", int(os.getenv("TUX_PREFETCH_WORKERS", 2)))
+
+def _terms(text: str) -> Set[str]:
+    """Content words of a question, for matching rephrasings"""
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOP_WORDS}
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard overlap of the content words of two questions"""
+    terms_a, terms_b = _terms(a), _terms(b)
+    if not terms_a or not terms_b:
+        return float(a.strip().lower() == b.strip().lower())
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+class FollowUpPrefetcher:
+    """Answer the likely next questions while the user reads and types.
+    
+    After each turn one or two follow-ups are predicted, from FOLLOW_UPS for
+    the topics of the turn or, with TUX_PREFETCH_SOURCE=model, by asking the
+    summary model. Their answers are computed in the background, but only
+    while some API key has at least TUX_PREFETCH_MIN_HEADROOM of its rate
+    budget spare, so prefetching never crowds out real questions. Answers
+    are kept for TUX_PREFETCH_TTL seconds and only until the next turn; a
+    next question close enough to a prediction is answered from them,
+    waiting for one still in flight rather than asking again.
+    """
+    
+    def __init__(self, groq_client, router: Optional[QueryRouter] = None, knowledge: Optional[KnowledgeIndex] = None):
+        self.groq_client = groq_client
+        self.router = router or QueryRouter(groq_client)
+        self.knowledge = knowledge
+        self.context = ContextWindow(reserve_tokens=groq_client.max_tokens)
+        self.count = int(os.getenv("TUX_PREFETCH_COUNT", 2))
+        self.source = os.getenv("TUX_PREFETCH_SOURCE", "static").lower()
+        self.model = os.getenv("TUX_SUMMARY_MODEL") or groq_client.backup_model
+        self.min_headroom = float(os.getenv("TUX_PREFETCH_MIN_HEADROOM", 0.5))
+        self.ttl = float(os.getenv("TUX_PREFETCH_TTL", 120))
+        self.match_threshold = float(os.getenv("TUX_PREFETCH_MATCH", 0.75))
+        self.asked: Set[str] = set()
+        self.suggestions: List[str] = []
+        # Question -> (answer in flight or done, expiry); replaced wholesale every turn
+        self._entries: Dict[str, Tuple["Future[Optional[str]]", float]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def predict(self, question: str, answer: str) -> List[str]:
+        """Likely next questions from the static map, most discussed topic first"""
+        counts = default_matcher().count(question) + default_matcher().count(answer)
+        predictions = []
+        for topic, _ in counts.most_common():
+            for follow_up in FOLLOW_UPS.get(topic, ()):
+                if follow_up.lower() not in self.asked and follow_up not in predictions:
+                    predictions.append(follow_up)
+                    break
+            if len(predictions) >= self.count:
+                break
+        return predictions
+    
+    def _suggest(self, question: str, answer: str) -> List[str]:
+        """Likely next questions as the model sees them"""
+        messages = [
+            {"role": "system", "content": SUGGEST_PROMPT.format(count=self.count)},
+            {"role": "user", "content": f"Question: {question}\n\nAnswer: {answer[:2000]}"}
+        ]
+        result = self.groq_client.chat_completion(messages, model=self.model, max_tokens=96) or ""
+        lines = (line.strip(" -*0123456789.)\t") for line in result.splitlines())
+        return [line for line in lines if line.endswith("?")][:self.count]
+    
+    def schedule(self, question: str, answer: str, prefix: Sequence[PromptMessage], history: Sequence[Message]):
+        """Start prefetching the follow-ups of a finished turn.
+        
+        `prefix` and `history` are the prompt prefix and a snapshot of the
+        conversation, so later turns can't change them underneath the workers.
+        """
+        with self._lock:
+            self.asked.add(question.strip().lower())
+            self._generation += 1
+            self._entries = {}
+            generation = self._generation
+        self.suggestions = [] if self.source == "model" else self.predict(question, answer)
+        if self.source != "model":
+            self._prefetch_all(generation, self.suggestions, list(prefix), list(history))
+        elif self.groq_client.scheduler.max_headroom() >= self.min_headroom:
+            _get_executor().submit(self._suggest_and_prefetch, generation, question, answer, list(prefix), list(history))
+    
+    def _suggest_and_prefetch(self, generation: int, question: str, answer: str, prefix: List[PromptMessage], history: List[Message]):
+        try:
+            suggestions = self._suggest(question, answer)
+        except Exception as e:
+            logger.debug(f"Follow-up suggestion failed: {e}")
+            return
+        if generation == self._generation:
+            self.suggestions = suggestions
+            self._prefetch_all(generation, suggestions, prefix, history)
+    
+    def _prefetch_all(self, generation: int, questions: List[str], prefix: List[PromptMessage], history: List[Message]):
+        for follow_up in questions:
+            if self.groq_client.scheduler.max_headroom() < self.min_headroom:
+                logger.debug("Skipping prefetch, API keys are busy")
+                return
+            future = _get_executor().submit(self._answer, follow_up, prefix, history)
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._entries[follow_up] = (future, time.monotonic() + self.ttl)
+            self.groq_client.metrics.record_prefetch()
+    
+    def _answer(self, question: str, prefix: List[PromptMessage], history: List[Message]) -> Optional[str]:
+        """The answer the chatbot would give if `question` were the next turn"""
+        prefix = list(prefix)
+        snippets = self.knowledge.search(question) if self.knowledge is not None else None
+        if snippets:
+            prefix.append(context_message(snippets))
+        messages = self.context.build(prefix, history + [{"role": "user", "content": question}])
+        route = self.router.route(question, len(history), record=False)
+        return self.groq_client.chat_completion(messages, model=route.model, max_tokens=route.max_tokens)
+    
+    def take(self, question: str) -> Optional[str]:
+        """The prefetched answer for the next question, if it matches a prediction.
+        
+        Every prefetched answer belongs to the turn before, so all of them are
+        dropped here whether or not one matched.
+        """
+        with self._lock:
+            entries, self._entries = self._entries, {}
+            self._generation += 1
+        now = time.monotonic()
+        best, best_score = None, self.match_threshold
+        for follow_up, (future, expires) in entries.items():
+            score = similarity(question, follow_up)
+            if expires > now and score >= best_score:
+                best, best_score = follow_up, score
+        if best is None:
+            return None
+        self.asked.add(best.lower())
+        best = entries[best][0]
+        try:
+            answer = best.result(timeout=self.groq_client.max_queue_wait)
+        except Exception as e:
+            logger.debug(f"Prefetched answer unavailable: {e}")
+            return None
+        if answer:
+            self.groq_client.metrics.record_prefetch_hit()
+        return answer
+    
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._generation += 1
+        self.asked.clear()
+        self.suggestions = []
+
+def default_prefetcher(groq_client, router: Optional[QueryRouter] = None, knowledge: Optional[KnowledgeIndex] = None) -> Optional[FollowUpPrefetcher]:
+    """A prefetcher for interactive front-ends, or None unless TUX_PREFETCH=1"""
+    if os.getenv("TUX_PREFETCH", "0").lower() not in ("1", "true", "yes"):
+        return None
+    return FollowUpPrefetcher(groq_client, router, knowledge)
@@ -0,0 +1,70 @@
+"""
+Compiled Prompt Templates and Personality Assets
+"""
+
+from functools import lru_cache
+from string import Template
+from typing import TYPE_CHECKING, Dict, NamedTuple, Sequence
+from context_window import count_tokens, MESSAGE_OVERHEAD_TOKENS
+from personality import TUX_PERSONALITY
+
+if TYPE_CHECKING:
+    from retrieval import Snippet
+
+class PromptMessage(NamedTuple):
+    """An immutable chat message whose token count is computed once"""
+    role: str
+    content: str
+    tokens: int
+    
+    @classmethod
+    def create(cls, role: str, content: str) -> "PromptMessage":
+        return cls(role, content, count_tokens(content) + MESSAGE_OVERHEAD_TOKENS)
+    
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+# The system prompt opens every request. It is rendered once per process and
+# must stay byte-identical between requests so the provider's prefix cache hits:
+# never interpolate per-request data (time, session, user) into it.
+SYSTEM_PROMPT_TEMPLATE = Template("""You are Tux, a senior MLOps/DevOps engineer with expertise in $expertise.
+
+        Your personality: $communication
+        
+        Communication style:
+        1. Be brutally honest and blunt
+        2. Use sarcasm and dry humor
+        3. Provide technical depth with practical insights
+        4. Focus on production-ready solutions
+        5. Reference real-world MLOps challenges
+        
+        When discussing:
+        - C++/Rust: Focus on performance, memory safety, and concurrency
+        - Backend Architecture: Emphasize scalability, observability, and fault tolerance
+        - Deployments: Discuss containerization, orchestration, and CI/CD
+        - MLOps: Highlight model versioning, monitoring, and infrastructure
+        
+        Always provide actionable, production-focused advice.
+        """)
+
+SUMMARY_TEMPLATE = Template("Summary of the earlier conversation:\n$summary")
+
+CONTEXT_TEMPLATE = Template(
+    "Reference material from the team's runbooks and docs. Prefer it over general "
+    "knowledge when it applies, and cite the file you used:\n\n$snippets"
+)
+
+SYSTEM_MESSAGE = PromptMessage.create("system", SYSTEM_PROMPT_TEMPLATE.substitute(
+    expertise=", ".join(TUX_PERSONALITY["traits"]["expertise"]),
+    communication=", ".join(TUX_PERSONALITY["traits"]["communication"])
+))
+
+@lru_cache(maxsize=1024)
+def summary_message(summary: str) -> PromptMessage:
+    """System message carrying a session's rolling summary, built once per summary"""
+    return PromptMessage.create("system", SUMMARY_TEMPLATE.substitute(summary=summary))
+
+def context_message(snippets: Sequence["Snippet"]) -> PromptMessage:
+    """System message carrying knowledge snippets retrieved for one turn"""
+    rendered = "\n\n".join(f"[{snippet.path}]\n{snippet.text}" for snippet in snippets)
+    return PromptMessage.create("system", CONTEXT_TEMPLATE.substitute(snippets=rendered))
@@ -0,0 +1,183 @@
+"""
+Response Cache in Front of the Groq Client
+"""
+
+import os
+import json
+import time
+import sqlite3
+import math
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def _normalize(text: str) -> str:
+    """Drop surrounding whitespace only; case and indentation change what code and YAML mean"""
+    return text.strip()
+
+class DiskCache:
+    """SQLite-backed second tier with TTL expiry and size-based eviction.
+    
+    Reads don't write: access times are kept in memory and written with the
+    next put, eviction, or every `touch_batch` hits, so a hit costs a single
+    SELECT rather than a commit.
+    """
+    
+    def __init__(self, path: str, ttl_seconds: float = 86400, max_bytes: int = 64 * 1024 * 1024, touch_batch: int = 256):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # A lost cache write only costs a recompute; skip the fsync per commit
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._delete(key)
+                self.conn.commit()
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._write_touches()
+                self.conn.commit()
+            return value
+    
+    def put(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._delete(key)
+            self.conn.execute(
+                "INSERT INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self.total_bytes += size
+            if self.total_bytes > self.max_bytes:
+                self._evict(now)
+            else:
+                self._write_touches()
+            self.conn.commit()
+    
+    def _write_touches(self):
+        """Write the access times of recent hits"""
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+    
+    def _delete(self, key: str):
+        self._touched.pop(key, None)
+        row = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.total_bytes -= row[0]
+    
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones, until under the size cap"""
+        self.conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = self.max_bytes * 0.9
+        self._write_touches()
+        while self.total_bytes > target:
+            rows = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if not rows:
+                self.total_bytes = 0
+                break
+            # Enough of the oldest entries, at the average size, to get under the target
+            count = max(1, math.ceil((self.total_bytes - target) * rows / self.total_bytes))
+            oldest = "SELECT rowid, size FROM responses ORDER BY accessed_at LIMIT ?"
+            self.total_bytes -= self.conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM ({oldest})", (count,)).fetchone()[0]
+            self.conn.execute(f"DELETE FROM responses WHERE rowid IN (SELECT rowid FROM ({oldest}))", (count,))
+
+class ResponseCache:
+    """Exact-match LRU of completions, optionally backed by a DiskCache.
+    
+    Sampling with temperature > 0 is non-deterministic, so those requests
+    bypass the cache unless `cache_nondeterministic` is set.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None, disk_path: Optional[str] = None, cache_nondeterministic: Optional[bool] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("TUX_CACHE_SIZE", 1024))
+        if cache_nondeterministic is None:
+            cache_nondeterministic = os.getenv("TUX_CACHE_NONDETERMINISTIC", "0").lower() in ("1", "true", "yes")
+        self.cache_nondeterministic = cache_nondeterministic
+        self.entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        disk_path = disk_path or os.getenv("TUX_CACHE_PATH")
+        self.disk = DiskCache(
+            disk_path,
+            ttl_seconds=float(os.getenv("TUX_CACHE_TTL", 86400)),
+            max_bytes=int(os.getenv("TUX_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        ) if disk_path else None
+    
+    def enabled_for(self, temperature: float) -> bool:
+        return self.max_entries > 0 and (temperature <= 0 or self.cache_nondeterministic)
+    
+    @staticmethod
+    def make_key(model: str, messages: List[dict], temperature: float, max_tokens: Optional[int] = None) -> str:
+        """Hash of (model, system prompt, recent history, temperature, answer budget) with trimmed text.
+        
+        `max_tokens` is part of the key so a short capped answer is never
+        served for a request with a bigger budget.
+        """
+        payload = json.dumps(
+            [model, round(temperature, 3), max_tokens, [(m["role"], _normalize(m.get("content") or "")) for m in messages]],
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                return value
+        if self.disk is None:
+            return None
+        value = self.disk.get(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+    
+    def put(self, key: str, value: str):
+        self._remember(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to write response to disk cache: {e}")
+    
+    def _remember(self, key: str, value: str):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
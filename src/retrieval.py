@@ -0,0 +1,217 @@
+"""
+Local Retrieval Index over MLOps Runbooks and Docs
+"""
+
+import os
+import re
+import time
+import sqlite3
+import argparse
+import threading
+import logging
+from contextlib import closing
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DOC_EXTENSIONS = (".md", ".markdown", ".txt", ".rst", ".adoc", ".yaml", ".yml", ".toml", ".ini", ".cfg", ".sh", ".py", ".tf", ".dockerfile")
+
+_WORD = re.compile(r"\w+")
+_MAX_QUERY_TERMS = 32
+
+# Words that match nearly every chunk and say nothing about the question
+STOP_WORDS = frozenset((
+    "a", "about", "after", "again", "all", "am", "an", "and", "any", "are", "as", "at", "be", "been",
+    "before", "being", "but", "by", "can", "could", "did", "do", "does", "doing", "for", "from", "get",
+    "got", "had", "has", "have", "hello", "hey", "hi", "how", "i", "if", "in", "into", "is", "it", "its",
+    "just", "me", "my", "no", "not", "of", "off", "ok", "on", "or", "our", "please", "should", "so",
+    "some", "than", "thank", "thanks", "that", "the", "their", "them", "then", "there", "these", "they",
+    "this", "those", "to", "too", "up", "us", "very", "was", "we", "were", "what", "when", "where",
+    "which", "who", "why", "will", "with", "would", "yes", "you", "your"
+))
+
+_index: Optional["KnowledgeIndex"] = None
+_index_lock = threading.Lock()
+
+class Snippet(NamedTuple):
+    path: str
+    text: str
+    score: float
+
+def chunk_text(text: str, max_chars: int) -> Iterator[str]:
+    """Split a document into paragraph-aligned chunks of about `max_chars`"""
+    chunk: List[str] = []
+    size = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if chunk and size + len(paragraph) > max_chars:
+            yield "\n\n".join(chunk)
+            chunk, size = [], 0
+        # A single huge paragraph is cut at the limit
+        while len(paragraph) > max_chars:
+            yield paragraph[:max_chars]
+            paragraph = paragraph[max_chars:]
+        chunk.append(paragraph)
+        size += len(paragraph) + 2
+    if chunk:
+        yield "\n\n".join(chunk)
+
+def match_query(text: str) -> Optional[str]:
+    """FTS5 query matching any of the content words in free text, or None if it has none"""
+    words = (word.lower() for word in _WORD.findall(text))
+    terms = list(dict.fromkeys(word for word in words if word not in STOP_WORDS))[:_MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return " OR ".join(f'"{term}"' for term in terms)
+
+class KnowledgeIndex:
+    """BM25 full-text index (SQLite FTS5) over a directory of documents.
+    
+    The index lives on disk next to the documents and is opened lazily on the
+    first query; reads go through SQLite's memory map, so only the pages a
+    query touches are loaded. `ingest()` re-indexes only files whose size or
+    mtime changed and drops files that were deleted.
+    """
+    
+    def __init__(self, docs_dir: str, path: Optional[str] = None, chunk_chars: Optional[int] = None):
+        self.docs_dir = os.path.abspath(docs_dir)
+        self.path = path or os.getenv("TUX_KNOWLEDGE_INDEX") or os.path.join(self.docs_dir, ".tux-index.sqlite")
+        self.chunk_chars = chunk_chars or int(os.getenv("TUX_KNOWLEDGE_CHUNK_CHARS", 800))
+        # Weaker matches are left out of the prompt entirely
+        self.min_score = float(os.getenv("TUX_KNOWLEDGE_MIN_SCORE", 1.0))
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._ingest_lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(os.getenv('TUX_KNOWLEDGE_MMAP_BYTES', 256 * 1024 * 1024))}")
+            conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)")
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(path UNINDEXED, content, tokenize='porter unicode61')")
+            conn.commit()
+            self.conn = conn
+        return self.conn
+    
+    def _documents(self) -> Iterator[Tuple[str, os.stat_result]]:
+        """(path relative to the docs directory, stat) of every indexable file"""
+        for root, dirs, files in os.walk(self.docs_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.startswith(".") or not name.lower().endswith(DOC_EXTENSIONS):
+                    continue
+                full_path = os.path.join(root, name)
+                yield os.path.relpath(full_path, self.docs_dir), os.stat(full_path)
+    
+    def ingest(self) -> Tuple[int, int, int]:
+        """Bring the index up to date; returns (indexed, removed, unchanged) file counts.
+        
+        Writes go through their own connection; with WAL, queries keep being
+        served from the last committed state meanwhile.
+        """
+        with self._lock:
+            self._connect()
+        with self._ingest_lock, closing(sqlite3.connect(self.path)) as conn:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute("SELECT path, size, mtime_ns FROM files")}
+            indexed = unchanged = 0
+            for path, stat in self._documents():
+                signature = known.pop(path, None)
+                if signature == (stat.st_size, stat.st_mtime_ns):
+                    unchanged += 1
+                    continue
+                try:
+                    with open(os.path.join(self.docs_dir, path), encoding="utf-8", errors="replace") as f:
+                        text = f.read()
+                except OSError as e:
+                    logger.warning(f"Skipping {path}: {e}")
+                    continue
+                # One transaction per file: a crash leaves every file either old or new
+                with conn:
+                    conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+                    conn.executemany("INSERT INTO chunks (path, content) VALUES (?, ?)", ((path, chunk) for chunk in chunk_text(text, self.chunk_chars)))
+                    conn.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns))
+                indexed += 1
+            
+            with conn:
+                for path in known:
+                    conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+                    conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        
+        if indexed or known:
+            logger.info(f"Knowledge index: {indexed} files indexed, {len(known)} removed, {unchanged} unchanged")
+        return indexed, len(known), unchanged
+    
+    def search(self, query: str, k: Optional[int] = None) -> List[Snippet]:
+        """Top-k chunks for free text scoring at least `min_score`, best first"""
+        expression = match_query(query)
+        if expression is None:
+            return []
+        k = k or int(os.getenv("TUX_KNOWLEDGE_TOP_K", 3))
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT path, content, bm25(chunks) AS rank FROM chunks WHERE chunks MATCH ? ORDER BY rank LIMIT ?",
+                (expression, k)
+            ).fetchall()
+        # FTS5's bm25() is negated so that better matches sort first
+        return [Snippet(path, content, -rank) for path, content, rank in rows if -rank >= self.min_score]
+    
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+def default_index() -> Optional[KnowledgeIndex]:
+    """The process-wide index over TUX_KNOWLEDGE_DIR, or None when it is unset.
+    
+    The first call starts an incremental ingest in the background; queries
+    meanwhile see whatever was indexed before.
+    """
+    global _index
+    docs_dir = os.getenv("TUX_KNOWLEDGE_DIR")
+    if not docs_dir:
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = KnowledgeIndex(docs_dir)
+            threading.Thread(target=_ingest_quietly, args=(_index,), name="tux-knowledge-ingest", daemon=True).start()
+        return _index
+
+def _ingest_quietly(index: KnowledgeIndex):
+    try:
+        index.ingest()
+    except Exception as e:
+        logger.warning(f"Knowledge ingest of {index.docs_dir} failed: {e}")
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build or query Tux's local knowledge index")
+    parser.add_argument("docs_dir", nargs="?", default=os.getenv("TUX_KNOWLEDGE_DIR"), help="directory of runbooks and docs (default: TUX_KNOWLEDGE_DIR)")
+    parser.add_argument("--search", metavar="QUERY", help="show the top matches for a query instead of ingesting")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+    if not args.docs_dir:
+        parser.error("no docs directory given and TUX_KNOWLEDGE_DIR is unset")
+    
+    index = KnowledgeIndex(args.docs_dir)
+    started = time.perf_counter()
+    if args.search:
+        snippets = index.search(args.search, args.k)
+        elapsed = time.perf_counter() - started
+        for snippet in snippets:
+            print(f"[{snippet.score:.3g}] {snippet.path}\n{snippet.text}\n")
+        print(f"{len(snippets)} matches in {elapsed * 1000:.1f} ms")
+    else:
+        indexed, removed, unchanged = index.ingest()
+        print(f"Indexed {indexed}, removed {removed}, unchanged {unchanged} files in {time.perf_counter() - started:.2f}s ({index.path})")
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Query Routing: Model Tier and Output Budget by Complexity
+"""
+
+import os
+import re
+import json
+import math
+import time
+import threading
+import logging
+from typing import Dict, NamedTuple, Optional, Tuple
+from personality import TUX_PERSONALITY
+
+logger = logging.getLogger(__name__)
+
+_CODE = re.compile(r"```|^(?: {4}|\t)\S|Traceback \(most recent call last\)|^\s*[$#] \w", re.MULTILINE)
+_WORD = re.compile(r"[\w+#/.-]+")
+_FOLLOW_UP = frozenset(("it", "that", "this", "those", "these", "above", "again", "same", "instead", "more"))
+# Asks for depth: designs, reviews, comparisons, migrations, walkthroughs
+_DEPTH = re.compile(
+    r"\b(?:design|architect\w*|review|compare|comparison|trade-?offs?|migrat\w+|"
+    r"refactor\w*|optimi[sz]\w*|debug\w*|troubleshoot\w*|step[- ]by[- ]step|"
+    r"in detail|deep dive|best practices?|strategy|production-ready|end-to-end|"
+    r"scale|scaling|pipeline|write|implement\w*|explain why|why does|why is|how should)\b",
+    re.IGNORECASE
+)
+
+def _expertise_terms() -> frozenset:
+    """Lowercase words of Tux's areas of expertise ("Backend Architecture" -> backend, architecture)"""
+    terms = set()
+    for area in TUX_PERSONALITY["traits"]["expertise"]:
+        terms.add(area.lower())
+        terms.update(word.lower() for word in area.split())
+    # Everyday spellings of the same areas
+    terms.update(("k8s", "kubectl", "helm", "cpp", "cargo", "dockerfile", "container", "containers", "deploy", "deployment", "ml", "cicd", "ci/cd"))
+    return frozenset(terms)
+
+EXPERTISE_TERMS = _expertise_terms()
+
+# A small logistic model over the features below; refit it from the routing
+# log and point TUX_ROUTER_WEIGHTS at a JSON file of the same shape
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    "bias": -2.6,
+    "log_words": 0.9,
+    "code": 2.0,
+    "expertise": 0.4,
+    "depth": 1.1,
+    "questions": 0.2,
+    "lines": 0.08,
+    "follow_up": 1.2
+}
+
+class Route(NamedTuple):
+    """Where one query goes. `model` is tried first, with the client's primary
+    and backup behind it; None goes straight to the primary"""
+    tier: str
+    model: Optional[str]
+    max_tokens: int
+    score: float
+
+def extract_features(query: str, history_length: int = 0) -> Dict[str, float]:
+    """Cheap, local features of a query for the router"""
+    words = [word.lower().strip(".,:;!?()[]\"'") for word in _WORD.findall(query)]
+    return {
+        "log_words": math.log1p(len(words)),
+        "code": 1.0 if _CODE.search(query) else 0.0,
+        "expertise": float(min(4, sum(1 for word in words if word in EXPERTISE_TERMS))),
+        "depth": float(min(3, len(_DEPTH.findall(query)))),
+        "questions": float(min(4, query.count("?"))),
+        "lines": float(min(20, query.count("\n"))),
+        # "and what about that?" only makes sense with the earlier, longer answer
+        "follow_up": 1.0 if history_length and len(words) <= 12 and _FOLLOW_UP.intersection(words) else 0.0
+    }
+
+def _load_weights() -> Dict[str, float]:
+    path = os.getenv("TUX_ROUTER_WEIGHTS")
+    if not path:
+        return DEFAULT_WEIGHTS
+    try:
+        with open(path, encoding="utf-8") as f:
+            return {**DEFAULT_WEIGHTS, **{name: float(value) for name, value in json.load(f).items()}}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring router weights {path}: {e}")
+        return DEFAULT_WEIGHTS
+
+class QueryRouter:
+    """Pick a model tier and an output-token cap per query.
+    
+    A logistic score over length, code, expertise keywords and depth cues
+    puts each query in a tier: quick factual questions go to the small model
+    with a short answer budget, everyday questions to the primary model with
+    a moderate cap, and long, code-heavy or design questions get the primary
+    model with the full MAX_TOKENS, so the big model's rate budget goes where
+    it matters. Decisions are counted in the client metrics and, with
+    TUX_ROUTING_LOG set, appended as JSONL with their features for refitting
+    the weights.
+    
+    Disabled (every query on the primary model with MAX_TOKENS) with TUX_ROUTING=0.
+    """
+    
+    def __init__(self, groq_client, enabled: Optional[bool] = None, weights: Optional[Dict[str, float]] = None, log_path: Optional[str] = None):
+        self.groq_client = groq_client
+        self.enabled = enabled if enabled is not None else os.getenv("TUX_ROUTING", "1").lower() in ("1", "true", "yes")
+        self.weights = weights or _load_weights()
+        self.thresholds = (
+            float(os.getenv("TUX_ROUTE_MEDIUM_SCORE", 0.45)),
+            float(os.getenv("TUX_ROUTE_LARGE_SCORE", 0.7))
+        )
+        full = groq_client.max_tokens
+        self.tiers: Dict[str, Tuple[Optional[str], int]] = {
+            "small": (os.getenv("GROQ_MODEL_SMALL", "llama-3.1-8b-instant"), min(full, int(os.getenv("TUX_ROUTE_SMALL_MAX_TOKENS", 512)))),
+            "medium": (None, min(full, int(os.getenv("TUX_ROUTE_MEDIUM_MAX_TOKENS", 1536)))),
+            "large": (None, full)
+        }
+        self.log_path = log_path or os.getenv("TUX_ROUTING_LOG")
+        self._log_lock = threading.Lock()
+    
+    def score(self, features: Dict[str, float]) -> float:
+        """Probability-like complexity of a query, 0..1"""
+        z = self.weights.get("bias", 0.0) + sum(self.weights.get(name, 0.0) * value for name, value in features.items())
+        return 1 / (1 + math.exp(-z))
+    
+    def route(self, query: str, history_length: int = 0, record: bool = True) -> Route:
+        """The tier for one query; `record=False` leaves it out of metrics and the log"""
+        if not self.enabled:
+            return Route("large", None, self.groq_client.max_tokens, 1.0)
+        features = extract_features(query, history_length)
+        score = self.score(features)
+        tier = "small"
+        if score >= self.thresholds[1]:
+            tier = "large"
+        elif score >= self.thresholds[0]:
+            tier = "medium"
+        # Code, and follow-ups building on an earlier answer, always get the primary model
+        if tier == "small" and (features["code"] or features["follow_up"]):
+            tier = "medium"
+        
+        model, max_tokens = self.tiers[tier]
+        route = Route(tier, model, max_tokens, round(score, 3))
+        if not record:
+            return route
+        self.groq_client.metrics.record_route(tier)
+        if self.log_path:
+            self._log(query, features, route)
+        return route
+    
+    def _log(self, query: str, features: Dict[str, float], route: Route):
+        record = {
+            "timestamp": time.time(),
+            "tier": route.tier,
+            "model": route.model or self.groq_client.model,
+            "max_tokens": route.max_tokens,
+            "score": route.score,
+            "features": {name: round(value, 3) for name, value in features.items()},
+            "chars": len(query)
+        }
+        try:
+            with self._log_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"Failed to log routing decision: {e}")
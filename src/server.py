@@ -0,0 +1,215 @@
+"""
+HTTP/SSE Serving Layer for Tux
+"""
+
+import os
+import re
+import json
+import hashlib
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from chatbot import TuxChatbot
+from history import ConversationHistory
+from groq_client import GroqClient, AsyncGroqClient
+from response_cache import ResponseCache
+from session_persistence import TurnStore
+from utils import MetricsCollector
+
+logger = logging.getLogger(__name__)
+
+class Session:
+    """One chat session: its chatbot state plus a lock serializing its turns"""
+    
+    __slots__ = ("chatbot", "lock", "last_access")
+    
+    def __init__(self, chatbot: TuxChatbot):
+        self.chatbot = chatbot
+        self.lock = asyncio.Lock()
+        self.last_access = time.monotonic()
+
+class SessionStore:
+    """Session ID -> Session map bounded by an LRU cap and an idle TTL.
+    
+    Sessions are kept in last-access order, so the expired ones are always at
+    the front and eviction never scans live sessions.
+    """
+    
+    def __init__(self, factory: Callable[[str], TuxChatbot], max_sessions: int = 10000, ttl_seconds: float = 1800):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+    
+    def get_or_create(self, session_id: Optional[str] = None) -> Tuple[str, Session]:
+        """Return the session for an ID, creating it (and a new ID) if needed"""
+        self.evict_expired()
+        
+        if session_id and session_id in self.sessions:
+            session = self.sessions[session_id]
+            self.sessions.move_to_end(session_id)
+        else:
+            session_id = session_id or uuid.uuid4().hex
+            session = Session(self.factory(session_id))
+            self.sessions[session_id] = session
+            while len(self.sessions) > self.max_sessions:
+                evicted_id, _ = self.sessions.popitem(last=False)
+                logger.info(f"Evicted least recently used session {evicted_id}")
+        
+        session.last_access = time.monotonic()
+        return session_id, session
+    
+    def evict_expired(self) -> int:
+        """Drop sessions idle for longer than the TTL"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        evicted = 0
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session.last_access >= cutoff:
+                break
+            del self.sessions[session_id]
+            evicted += 1
+        return evicted
+    
+    def delete(self, session_id: str) -> bool:
+        """Remove a session"""
+        return self.sessions.pop(session_id, None) is not None
+    
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+class ChatRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+
+class ChatResponse(BaseModel):
+    session_id: str
+    response: str
+
+def history_spill_path(session_id: str) -> Optional[str]:
+    """Per-session log for turns evicted from memory, if TUX_HISTORY_SPILL_DIR is set"""
+    spill_dir = os.getenv("TUX_HISTORY_SPILL_DIR")
+    if not spill_dir:
+        return None
+    # Session IDs come from clients; never let one choose the file name
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", session_id):
+        session_id = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+    return os.path.join(spill_dir, f"{session_id}.jsonl")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the clients shared by every session, and close them on shutdown"""
+    cache = ResponseCache()
+    metrics = MetricsCollector()
+    groq_client = GroqClient(cache=cache, metrics=metrics)
+    # Summaries and prefetches go through the sync client, chats through the
+    # async one; both draw on the same keys' rate budgets and circuits
+    async_client = AsyncGroqClient(cache=cache, metrics=metrics, scheduler=groq_client.scheduler, breakers=groq_client.breakers)
+    # Turns outlive the process (and the in-memory LRU) when TUX_SESSION_DB is set
+    session_db = os.getenv("TUX_SESSION_DB")
+    turn_store = None
+    if session_db:
+        try:
+            turn_store = TurnStore(session_db)
+        except (OSError, sqlite3.Error) as e:
+            # e.g. a bind-mounted directory the container user can't write to
+            logger.warning(f"Session persistence disabled, can't open {session_db}: {e}")
+    app.state.sessions = SessionStore(
+        factory=lambda session_id: TuxChatbot(
+            groq_client=groq_client,
+            async_client=async_client,
+            history=ConversationHistory(spill_path=history_spill_path(session_id)),
+            journal=turn_store.journal(session_id) if turn_store else None
+        ),
+        max_sessions=int(os.getenv("TUX_MAX_SESSIONS", 10000)),
+        ttl_seconds=float(os.getenv("TUX_SESSION_TTL", 1800))
+    )
+    app.state.async_client = async_client
+    app.state.metrics = metrics
+    app.state.turn_store = turn_store
+    # Start serving right away; the SDK import and first connection happen in the background
+    warmup = asyncio.create_task(async_client.warmup())
+    yield
+    warmup.cancel()
+    await async_client.aclose()
+    if turn_store:
+        turn_store.close()
+
+app = FastAPI(title="Tux MLOps Chatbot", lifespan=lifespan)
+
+@app.get("/health")
+async def health():
+    """Liveness/readiness probe"""
+    circuits = app.state.async_client.breakers.states()
+    return {
+        "status": "degraded" if "open" in circuits.values() else "ok",
+        "sessions": len(app.state.sessions),
+        "api_keys": len(app.state.async_client.clients),
+        "circuits": circuits
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(app.state.metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest):
+    """Answer a message in one response"""
+    session_id, session = app.state.sessions.get_or_create(request.session_id)
+    async with session.lock:
+        chunks = [token async for token in session.chatbot.aprocess_query_stream(request.message)]
+    return ChatResponse(session_id=session_id, response="".join(chunks))
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Answer a message as a Server-Sent Events stream of tokens"""
+    session_id, session = app.state.sessions.get_or_create(request.session_id)
+    
+    async def events():
+        yield f"event: session\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        async with session.lock:
+            async for token in session.chatbot.aprocess_query_stream(request.message):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"X-Session-ID": session_id, "Cache-Control": "no-cache"}
+    )
+
+@app.post("/sessions/{session_id}/reset")
+async def reset_session(session_id: str):
+    """Clear a session's conversation history"""
+    _, session = app.state.sessions.get_or_create(session_id)
+    async with session.lock:
+        return {"session_id": session_id, "message": session.chatbot.reset_conversation()}
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Drop a session and its state"""
+    turn_store = app.state.turn_store
+    persisted = turn_store is not None and await asyncio.to_thread(turn_store.exists, session_id)
+    if not app.state.sessions.delete(session_id) and not persisted:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if turn_store:
+        turn_store.submit(session_id, "reset")
+    return {"session_id": session_id, "deleted": True}
+
+def main():
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", 8000)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Persistent Session Store with Write-Behind Batching
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import threading
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class TurnStore:
+    """SQLite (WAL) log of conversation turns and summaries for every session.
+    
+    Writes are queued and committed by a background thread in batches, so the
+    request path never waits on disk. Reads flush the session's pending writes
+    first, so a session always rehydrates what it wrote.
+    """
+    
+    def __init__(self, path: str, flush_interval: Optional[float] = None, batch_size: int = 256):
+        self.path = path
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("TUX_SESSION_FLUSH_INTERVAL", 0.5))
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes without an fsync per commit
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+            "content TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (session_id, seq))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, through_seq INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        
+        self._db_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._pending_cond = threading.Condition()
+        self._writer = threading.Thread(target=self._run, name="tux-session-writer", daemon=True)
+        self._writer.start()
+    
+    def journal(self, session_id: str) -> "SessionJournal":
+        return SessionJournal(self, session_id)
+    
+    def submit(self, session_id: str, op: str, *args):
+        """Queue a write; returns immediately"""
+        with self._pending_cond:
+            self._pending[session_id] += 1
+        self._queue.put((session_id, op, args))
+    
+    def load(self, session_id: str, limit: int) -> Tuple[str, int, int, List[Tuple[str, str]]]:
+        """Summary, the seq it covers, the last seq, and up to `limit` newest turns after the summary"""
+        self.flush_session(session_id)
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT summary, through_seq FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            summary, through_seq = row if row else ("", 0)
+            # A reset keeps its last seq in the summary row, so numbering never restarts
+            last_seq = max(through_seq, self.conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM turns WHERE session_id = ?", (session_id,)
+            ).fetchone()[0])
+            rows = self.conn.execute(
+                "SELECT role, content FROM turns WHERE session_id = ? AND seq > ? ORDER BY seq DESC LIMIT ?",
+                (session_id, through_seq, limit)
+            ).fetchall()
+        rows.reverse()
+        return summary, through_seq, last_seq, rows
+    
+    def exists(self, session_id: str) -> bool:
+        """Whether anything is persisted for a session"""
+        self.flush_session(session_id)
+        with self._db_lock:
+            return self.conn.execute(
+                "SELECT 1 FROM turns WHERE session_id = ? UNION ALL SELECT 1 FROM summaries WHERE session_id = ? LIMIT 1",
+                (session_id, session_id)
+            ).fetchone() is not None
+    
+    def flush_session(self, session_id: str, timeout: Optional[float] = None) -> bool:
+        """Wait until the session's queued writes are committed"""
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: not self._pending.get(session_id), timeout)
+    
+    def flush(self):
+        """Wait until every queued write is committed"""
+        self._queue.join()
+    
+    def close(self):
+        """Commit what is queued and stop the writer"""
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._db_lock:
+            self.conn.close()
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            writes = [item for item in batch if item is not _STOP]
+            try:
+                self._write(writes)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to persist {len(writes)} session writes: {e}")
+            finally:
+                with self._pending_cond:
+                    for session_id, _, _ in writes:
+                        self._pending[session_id] -= 1
+                        if not self._pending[session_id]:
+                            del self._pending[session_id]
+                    self._pending_cond.notify_all()
+                for _ in batch:
+                    self._queue.task_done()
+            
+            if batch[-1] is _STOP:
+                return
+    
+    def _write(self, writes: List[tuple]):
+        """Apply a batch of writes in one transaction"""
+        with self._db_lock, self.conn:
+            for session_id, op, args in writes:
+                if op == "turn":
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO turns (session_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (session_id, *args)
+                    )
+                elif op == "summary":
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO summaries (session_id, summary, through_seq, updated_at) VALUES (?, ?, ?, ?)",
+                        (session_id, *args)
+                    )
+                elif op == "reset":
+                    self.conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                    self.conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+                    if args:
+                        # Cleared but not deleted: remember how far the numbering got
+                        self.conn.execute(
+                            "INSERT INTO summaries (session_id, summary, through_seq, updated_at) VALUES (?, '', ?, ?)",
+                            (session_id, *args)
+                        )
+
+class SessionJournal:
+    """A TurnStore bound to one session, numbering its turns"""
+    
+    __slots__ = ("store", "session_id", "seq")
+    
+    def __init__(self, store: TurnStore, session_id: str):
+        self.store = store
+        self.session_id = session_id
+        self.seq = 0
+    
+    def load(self, limit: int) -> Tuple[str, List[Tuple[str, str]]]:
+        """The persisted summary and most recent turns (role, content), oldest first"""
+        summary, _, self.seq, turns = self.store.load(self.session_id, limit)
+        return summary, turns
+    
+    def record(self, role: str, content: str):
+        self.seq += 1
+        self.store.submit(self.session_id, "turn", self.seq, role, content, time.time())
+    
+    def record_summary(self, summary: str, live_messages: int):
+        """Persist the summary as covering every turn except the `live_messages` newest"""
+        self.store.submit(self.session_id, "summary", summary, self.seq - live_messages, time.time())
+    
+    def record_reset(self):
+        """Forget the session's turns; numbering carries on so exported transcripts stay in order"""
+        self.store.submit(self.session_id, "reset", self.seq, time.time())
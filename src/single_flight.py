@@ -0,0 +1,259 @@
+"""
+Single-Flight Coalescing of Identical In-Flight Requests
+"""
+
+import asyncio
+import threading
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+from response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def flight_key(model: Optional[str], messages: List[dict], temperature: float, max_tokens: Optional[int]) -> str:
+    """Identity of an upstream call: the response cache's key over the call options"""
+    # No explicit model means the primary -> backup fallback chain
+    return ResponseCache.make_key(model or "*", messages, temperature, max_tokens)
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+class _Broadcast:
+    """One upstream token stream replayed to every subscriber.
+    
+    There is no dedicated pump thread: whichever subscriber runs out of
+    buffered chunks pulls the next one from the source, so the stream advances
+    at the pace of its fastest reader and late joiners replay from the start.
+    """
+    
+    def __init__(self, source: Iterator[str], on_done: Callable[[], None]):
+        self.source = source
+        self.on_done = on_done
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._pull_lock = threading.Lock()
+    
+    def subscribe(self, on_leave: Callable[["_Broadcast"], bool]) -> Iterator[str]:
+        index = 0
+        try:
+            while True:
+                if index < len(self.chunks):
+                    index += 1
+                    yield self.chunks[index - 1]
+                elif self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    self._pull(index)
+        finally:
+            if on_leave(self):
+                # Last subscriber gone mid-stream: abort the upstream request
+                with self._pull_lock:
+                    self.finished = True
+                    self.source.close()
+    
+    def _pull(self, index: int):
+        with self._pull_lock:
+            if index < len(self.chunks) or self.finished:
+                # Another subscriber pulled while we waited for the lock
+                return
+            try:
+                self.chunks.append(next(self.source))
+                return
+            except StopIteration:
+                pass
+            except Exception as e:
+                self.error = e
+            self.finished = True
+        self.on_done()
+
+class SingleFlight:
+    """Share one upstream call between concurrent identical requests (thread-safe).
+    
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for and receive the same result, or the same exception.
+    `on_join` is called once per caller that piggybacks on another's call.
+    """
+    
+    def __init__(self, on_join: Optional[Callable[[], None]] = None):
+        self.on_join = on_join
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+    
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        
+        if not leader:
+            self._joined()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+    
+    def stream(self, key: str, fn: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Subscribe to the in-flight stream for `key`, starting it with `fn` if there is none"""
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                broadcast = _Broadcast(fn(), lambda: self._forget(key, broadcast))
+                self._streams[key] = broadcast
+            else:
+                self._joined()
+            broadcast.subscribers += 1
+        return broadcast.subscribe(lambda b: self._leave(key, b))
+    
+    def _forget(self, key: str, broadcast: _Broadcast):
+        with self._lock:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+    
+    def _leave(self, key: str, broadcast: _Broadcast) -> bool:
+        """Drop one subscriber; True if it was the last one and the stream is unfinished"""
+        with self._lock:
+            broadcast.subscribers -= 1
+            abandoned = broadcast.subscribers == 0 and not broadcast.finished
+            if abandoned and self._streams.get(key) is broadcast:
+                del self._streams[key]
+            return abandoned
+    
+    def _joined(self):
+        if self.on_join:
+            self.on_join()
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+class _AsyncBroadcast:
+    """One upstream async token stream, pumped by a task and replayed to every subscriber"""
+    
+    def __init__(self, source: AsyncIterator[str], on_done: Callable[[], None]):
+        self.source = source
+        self.on_done = on_done
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump())
+    
+    async def _pump(self):
+        try:
+            async for token in self.source:
+                self.chunks.append(token)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._notify()
+            self.on_done()
+    
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+    
+    async def subscribe(self, on_leave: Callable[["_AsyncBroadcast"], bool]) -> AsyncIterator[str]:
+        index = 0
+        try:
+            while True:
+                if index < len(self.chunks):
+                    index += 1
+                    yield self.chunks[index - 1]
+                elif self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await self._changed.wait()
+        finally:
+            if on_leave(self):
+                # Last subscriber gone mid-stream: abort the upstream request
+                self.task.cancel()
+
+class AsyncSingleFlight:
+    """Asyncio counterpart of SingleFlight.
+    
+    The shared call runs as its own task; it is cancelled only once every
+    caller waiting on it has been cancelled.
+    """
+    
+    def __init__(self, on_join: Optional[Callable[[], None]] = None):
+        self.on_join = on_join
+        self._calls: Dict[str, _AsyncCall] = {}
+        self._streams: Dict[str, _AsyncBroadcast] = {}
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+            
+            def forget(_):
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.task.add_done_callback(forget)
+        elif self.on_join:
+            self.on_join()
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+    
+    def stream(self, key: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Subscribe to the in-flight stream for `key`, starting it with `fn` if there is none"""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _AsyncBroadcast(fn(), lambda: self._forget(key, broadcast))
+            self._streams[key] = broadcast
+        elif self.on_join:
+            self.on_join()
+        broadcast.subscribers += 1
+        return broadcast.subscribe(lambda b: self._leave(key, b))
+    
+    def _forget(self, key: str, broadcast: _AsyncBroadcast):
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+    
+    def _leave(self, key: str, broadcast: _AsyncBroadcast) -> bool:
+        """Drop one subscriber; True if it was the last one and the stream is unfinished"""
+        broadcast.subscribers -= 1
+        abandoned = broadcast.subscribers == 0 and not broadcast.finished
+        if abandoned:
+            self._forget(key, broadcast)
+        return abandoned
@@ -0,0 +1,59 @@
+"""
+Rolling Conversation Summarizer
+"""
+
+import os
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+from history import Message
+from utils import background_executor
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain the running memory of a conversation between a user and Tux, "
+    "a senior MLOps/DevOps engineer. Merge the existing summary and the new turns "
+    "into one concise summary. Keep technical facts, decisions, the user's stack "
+    "and open questions. Drop small talk. Answer with the summary only."
+)
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by every session's summarizer"""
+    return background_executor("summarizer", int(os.getenv("TUX_SUMMARY_WORKERS", 2)))
+
+class ConversationSummarizer:
+    """Compress the oldest turns of a session into a running summary.
+    
+    Summaries are produced off the request path on a shared worker pool with a
+    cheaper model (the backup model unless TUX_SUMMARY_MODEL is set).
+    """
+    
+    def __init__(self, groq_client, threshold: Optional[int] = None, keep_recent: Optional[int] = None):
+        self.groq_client = groq_client
+        self.threshold = threshold or int(os.getenv("TUX_SUMMARY_THRESHOLD", 20))
+        self.keep_recent = keep_recent or int(os.getenv("TUX_SUMMARY_KEEP", 10))
+        self.model = os.getenv("TUX_SUMMARY_MODEL") or groq_client.backup_model
+        self.max_tokens = int(os.getenv("TUX_SUMMARY_MAX_TOKENS", 512))
+    
+    def fold_count(self, history_length: int) -> int:
+        """How many of the oldest messages to fold into the summary, 0 if none yet"""
+        if history_length <= self.threshold:
+            return 0
+        return history_length - self.keep_recent
+    
+    def submit(self, summary: str, turns: List[Message]) -> "Future[str]":
+        """Start summarizing in the background"""
+        return _get_executor().submit(self.summarize, summary, list(turns))
+    
+    def summarize(self, summary: str, turns: List[Message]) -> str:
+        """Merge `turns` into `summary` with one model call"""
+        transcript = "\n".join(
+            f"{'User' if turn.role == 'user' else 'Tux'}: {turn.content}" for turn in turns
+        )
+        messages = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+        ]
+        result = self.groq_client.chat_completion(messages, model=self.model, max_tokens=self.max_tokens)
+        return result.strip() if result else summary
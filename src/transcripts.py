@@ -0,0 +1,213 @@
+"""
+Streaming Transcript Export and Import
+"""
+
+import io
+import os
+import csv
+import gzip
+import json
+import logging
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("session_id", "seq", "role", "content", "timestamp")
+
+def open_text(path: str, mode: str = "r") -> IO[str]:
+    """Open a transcript for streaming text I/O, compressed by suffix (.gz, .zst).
+    
+    Appending to a compressed file adds a new gzip member / zstd frame, which
+    readers decode as one continuous stream.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd transcripts need the optional zstandard package (pip install zstandard)")
+        raw = open(path, mode + "b")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+def _tail_line(path: str, block: int = 4096) -> Optional[bytes]:
+    """Last complete line of an uncompressed file, read backwards from the end"""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        data = b""
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+            lines = data.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or start == 0:
+                return lines[-1] or None
+    return None
+
+def _drop_torn_tail(path: str, block: int = 4096):
+    """Cut off a partial last line left by an interrupted export so appends start clean"""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if not end:
+            return
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return
+        position = end
+        while position > 0:
+            start = max(0, position - block)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+class JsonlExporter:
+    """Append-only JSONL transcript of one session.
+    
+    Each record is {"session_id", "seq", "role", "content", "timestamp"}.
+    `export()` writes only the messages with a seq past the last one already
+    in the file, so repeated exports of a growing conversation touch just the
+    delta and hold one record in memory at a time. The last exported seq is
+    found once, from the file's tail (or a streaming scan when compressed or
+    shared with other sessions), and tracked in memory afterwards.
+    """
+    
+    def __init__(self, path: str, session_id: str = ""):
+        self.path = path
+        self.session_id = session_id
+        self.last_seq: Optional[int] = None
+    
+    def _find_last_seq(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        if not self.path.endswith((".gz", ".zst")):
+            _drop_torn_tail(self.path)
+            line = _tail_line(self.path)
+            try:
+                record = json.loads(line) if line else None
+            except json.JSONDecodeError:
+                record = None
+            if record and record.get("session_id") == self.session_id:
+                return int(record["seq"])
+        last = 0
+        for record in read_transcript(self.path):
+            if record.get("session_id") == self.session_id:
+                last = max(last, int(record.get("seq") or 0))
+        return last
+    
+    def export(self, messages: Iterable, first_seq: int = 1) -> int:
+        """Append the messages not exported yet and return how many were written.
+        
+        Messages are history records or dicts. Each is numbered by its own
+        `seq` (ConversationHistory numbers every message for the whole
+        conversation, so eviction and summary folds don't shift it); a plain
+        dict without one gets its list position counted from `first_seq`.
+        """
+        if self.last_seq is None:
+            self.last_seq = self._find_last_seq()
+        now = datetime.now().isoformat()
+        written = 0
+        out = None
+        try:
+            for position, message in enumerate(messages, first_seq):
+                if isinstance(message, dict):
+                    seq = message.get("seq") or position
+                    role, content, timestamp = message["role"], message["content"], message.get("timestamp")
+                else:
+                    seq, role, content, timestamp = message.seq or position, message.role, message.content, None
+                if seq <= self.last_seq:
+                    continue
+                if out is None:
+                    out = open_text(self.path, "a")
+                out.write(json.dumps({
+                    "session_id": self.session_id,
+                    "seq": seq,
+                    "role": role,
+                    "content": content,
+                    "timestamp": timestamp or now
+                }, ensure_ascii=False) + "\n")
+                self.last_seq = seq
+                written += 1
+        finally:
+            if out is not None:
+                out.close()
+        return written
+
+def read_transcript(path: str) -> Iterator[Dict]:
+    """Stream the records of any transcript this module writes.
+    
+    Handles JSONL (optionally .gz/.zst), CSV (optionally .gz), Parquet (in
+    row batches) and the single-document JSON of ConversationExporter.export_to_json.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    elif path.endswith((".csv", ".csv.gz", ".csv.zst")):
+        with open_text(path) as f:
+            for record in csv.DictReader(f):
+                record["seq"] = int(record["seq"]) if record.get("seq") else None
+                yield record
+    elif path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        yield from data.get("conversation", []) if isinstance(data, dict) else data
+    else:
+        with open_text(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from an interrupted export
+                    continue
+                if isinstance(record, dict):
+                    yield record
+
+def export_columnar(records: Iterable[Dict], path: str, batch_size: int = 10000) -> str:
+    """Write transcript records in a columnar/tabular file for analytics.
+    
+    `.parquet` is written in row groups of `batch_size` with pyarrow when it is
+    installed; otherwise (or for `.csv`/`.csv.gz`) a CSV is streamed, and a
+    `.parquet` request falls back to `<name>.csv.gz`. Returns the path written.
+    """
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            fallback = path[:-len(".parquet")] + ".csv.gz"
+            logger.warning(f"pyarrow is not installed, writing {fallback} instead of {path}")
+            path = fallback
+        else:
+            schema = pa.schema([
+                ("session_id", pa.string()), ("seq", pa.int64()), ("role", pa.string()),
+                ("content", pa.string()), ("timestamp", pa.string())
+            ])
+            with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+                batch: List[Dict] = []
+                for record in records:
+                    batch.append({column: record.get(column) for column in COLUMNS})
+                    if len(batch) >= batch_size:
+                        writer.write_table(pa.Table.from_pylist(batch, schema))
+                        batch = []
+                if batch:
+                    writer.write_table(pa.Table.from_pylist(batch, schema))
+            return path
+    
+    with open_text(path, "w") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+    return path
@@ -2,14 +2,70 @@
 Utility functions for MLOps showcase
 """
 
+import os
 import json
 import time
+import bisect
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import logging
+from analytics import TopicStats, default_matcher
+from transcripts import JsonlExporter, export_columnar
 
 logger = logging.getLogger(__name__)
 
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+def background_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """Process-wide worker pool for one kind of background work, created on first use"""
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"tux-{name}")
+        return executor
+
+# Latency histogram bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, float("inf"))
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram: O(1) memory, quantiles by in-bucket interpolation"""
+    
+    __slots__ = ("counts", "count", "total")
+    
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+    
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+    
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile the way Prometheus' histogram_quantile does"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+                upper = LATENCY_BUCKETS[i]
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return LATENCY_BUCKETS[-2]
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
 class MetricsCollector:
     """Collect metrics for MLOps showcase"""
     
@@ -17,46 +73,207 @@ class MetricsCollector:
         self.metrics = {
             "api_calls": 0,
             "tokens_processed": 0,
-            "response_times": [],
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
             "fallback_activations": 0,
-            "errors": 0
+            "key_rotations": 0,
+            "errors": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "coalesced_requests": 0,
+            "hedged_requests": 0,
+            "hedge_wins": 0,
+            "prefetches": 0,
+            "prefetch_hits": 0,
+            "queries": 0
         }
+        self.latency = LatencyHistogram()
+        # Per-(API key, model) upstream latency and per-model time to first token
+        self.api_latency: Dict[Tuple[str, str], LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.ttft: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        # End-to-end latency of TuxChatbot turns
+        self.query_latency = LatencyHistogram()
+        self.query_ttft = LatencyHistogram()
+        # Queries per routing tier (routing.py)
+        self.routes: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
     
-    def record_api_call(self, tokens: int, response_time: float):
+    def record_api_call(self, tokens: int, response_time: float, key: str = "", model: str = "", prompt_tokens: int = 0, completion_tokens: int = 0):
         """Record API call metrics"""
-        self.metrics["api_calls"] += 1
-        self.metrics["tokens_processed"] += tokens
-        self.metrics["response_times"].append(response_time)
+        with self._lock:
+            self.metrics["api_calls"] += 1
+            self.metrics["tokens_processed"] += tokens
+            self.metrics["prompt_tokens"] += prompt_tokens
+            self.metrics["completion_tokens"] += completion_tokens
+            self.latency.observe(response_time)
+            self.api_latency[(key, model)].observe(response_time)
+    
+    def record_ttft(self, model: str, seconds: float):
+        """Record time to first token of a streamed completion"""
+        with self._lock:
+            self.ttft[model].observe(seconds)
+    
+    def record_query(self, latency: float, ttft: Optional[float] = None):
+        """Record end-to-end latency of one chatbot turn"""
+        with self._lock:
+            self.metrics["queries"] += 1
+            self.query_latency.observe(latency)
+            if ttft is not None:
+                self.query_ttft.observe(ttft)
     
     def record_fallback(self):
         """Record fallback activation"""
-        self.metrics["fallback_activations"] += 1
+        with self._lock:
+            self.metrics["fallback_activations"] += 1
+    
+    def record_rotation(self):
+        """Record a retry moving to another API key"""
+        with self._lock:
+            self.metrics["key_rotations"] += 1
     
     def record_error(self):
         """Record error"""
-        self.metrics["errors"] += 1
+        with self._lock:
+            self.metrics["errors"] += 1
+    
+    def record_cache_hit(self):
+        """Record response cache hit"""
+        with self._lock:
+            self.metrics["cache_hits"] += 1
+    
+    def record_cache_miss(self):
+        """Record response cache miss"""
+        with self._lock:
+            self.metrics["cache_misses"] += 1
+    
+    def record_coalesced(self):
+        """Record a request served by another identical in-flight request"""
+        with self._lock:
+            self.metrics["coalesced_requests"] += 1
+    
+    def record_hedge(self):
+        """Record a backup request sent for a slow one on another API key"""
+        with self._lock:
+            self.metrics["hedged_requests"] += 1
+    
+    def record_hedge_win(self):
+        """Record a backup request answering before the one it hedged"""
+        with self._lock:
+            self.metrics["hedge_wins"] += 1
+    
+    def record_prefetch(self):
+        """Record a follow-up answer computed ahead of the question"""
+        with self._lock:
+            self.metrics["prefetches"] += 1
+    
+    def record_prefetch_hit(self):
+        """Record a question answered from a prefetched follow-up"""
+        with self._lock:
+            self.metrics["prefetch_hits"] += 1
+    
+    def record_route(self, tier: str):
+        """Record the model tier a query was routed to"""
+        with self._lock:
+            self.routes[tier] += 1
     
     def get_summary(self) -> Dict[str, Any]:
         """Get metrics summary"""
         return {
             "total_api_calls": self.metrics["api_calls"],
             "total_tokens": self.metrics["tokens_processed"],
-            "avg_response_time": sum(self.metrics["response_times"]) / len(self.metrics["response_times"]) if self.metrics["response_times"] else 0,
+            "avg_response_time": self.latency.mean,
+            "p50_response_time": self.latency.quantile(0.5),
+            "p95_response_time": self.latency.quantile(0.95),
+            "p99_response_time": self.latency.quantile(0.99),
+            "p50_query_latency": self.query_latency.quantile(0.5),
+            "p95_query_latency": self.query_latency.quantile(0.95),
+            "p50_query_ttft": self.query_ttft.quantile(0.5),
+            "p95_query_ttft": self.query_ttft.quantile(0.95),
             "fallback_rate": self.metrics["fallback_activations"] / self.metrics["api_calls"] if self.metrics["api_calls"] > 0 else 0,
             "error_rate": self.metrics["errors"] / self.metrics["api_calls"] if self.metrics["api_calls"] > 0 else 0,
+            "key_rotations": self.metrics["key_rotations"],
+            "cache_hits": self.metrics["cache_hits"],
+            "cache_misses": self.metrics["cache_misses"],
+            "cache_hit_rate": self.metrics["cache_hits"] / (self.metrics["cache_hits"] + self.metrics["cache_misses"]) if self.metrics["cache_hits"] + self.metrics["cache_misses"] > 0 else 0,
+            "coalesced_requests": self.metrics["coalesced_requests"],
+            "hedged_requests": self.metrics["hedged_requests"],
+            "hedge_wins": self.metrics["hedge_wins"],
+            "prefetches": self.metrics["prefetches"],
+            "prefetch_hits": self.metrics["prefetch_hits"],
+            "routes": dict(self.routes),
             "timestamp": datetime.now().isoformat()
         }
+    
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        counters = [
+            ("tux_api_calls_total", "Successful upstream completions", "api_calls"),
+            ("tux_tokens_total", "Tokens reported by the API usage field", "tokens_processed"),
+            ("tux_prompt_tokens_total", "Prompt tokens reported by the API", "prompt_tokens"),
+            ("tux_completion_tokens_total", "Completion tokens reported by the API", "completion_tokens"),
+            ("tux_fallbacks_total", "Requests served by the backup model", "fallback_activations"),
+            ("tux_key_rotations_total", "Retries moved to another API key", "key_rotations"),
+            ("tux_errors_total", "Failed upstream attempts", "errors"),
+            ("tux_cache_hits_total", "Response cache hits", "cache_hits"),
+            ("tux_cache_misses_total", "Response cache misses", "cache_misses"),
+            ("tux_coalesced_requests_total", "Requests that shared an identical in-flight upstream call", "coalesced_requests"),
+            ("tux_hedged_requests_total", "Backup requests sent for slow requests", "hedged_requests"),
+            ("tux_hedge_wins_total", "Backup requests that answered first", "hedge_wins"),
+            ("tux_prefetches_total", "Follow-up answers computed ahead of the question", "prefetches"),
+            ("tux_prefetch_hits_total", "Questions answered from a prefetched follow-up", "prefetch_hits"),
+            ("tux_queries_total", "Chatbot turns answered", "queries"),
+        ]
+        with self._lock:
+            for name, help_text, field in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {self.metrics[field]}"]
+            
+            lines += ["# HELP tux_routed_queries_total Queries per routing tier", "# TYPE tux_routed_queries_total counter"]
+            lines += [f'tux_routed_queries_total{{tier="{tier}"}} {count}' for tier, count in sorted(self.routes.items())]
+            
+            lines += _render_histogram(
+                "tux_api_latency_seconds", "Upstream completion latency",
+                {f'key="{key}",model="{model}"': h for (key, model), h in self.api_latency.items()}
+            )
+            lines += _render_histogram(
+                "tux_ttft_seconds", "Upstream time to first streamed token",
+                {f'model="{model}"': h for model, h in self.ttft.items()}
+            )
+            lines += _render_histogram("tux_query_latency_seconds", "End-to-end chatbot turn latency", {"": self.query_latency})
+            lines += _render_histogram("tux_query_ttft_seconds", "Chatbot turn time to first token", {"": self.query_ttft})
+        return "\n".join(lines) + "\n"
+
+def _render_histogram(name: str, help_text: str, series: Dict[str, LatencyHistogram]) -> List[str]:
+    """Prometheus exposition lines for a labeled family of histograms"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series.items():
+        prefix = f"{labels}," if labels else ""
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, histogram.counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {histogram.total}")
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
 
 class ConversationExporter:
     """Export conversations for analysis"""
     
     @staticmethod
-    def export_to_json(conversation_history: list, filename: str):
+    def _as_dicts(conversation_history) -> List[Dict]:
+        """Role/content dicts from a ConversationHistory, its Message records or a list of dicts"""
+        return [message if isinstance(message, dict) else message.to_dict() for message in conversation_history]
+    
+    @staticmethod
+    def export_to_json(conversation_history, filename: str):
         """Export conversation to JSON"""
+        messages = ConversationExporter._as_dicts(conversation_history)
         data = {
             "exported_at": datetime.now().isoformat(),
-            "total_messages": len(conversation_history),
-            "conversation": conversation_history
+            "total_messages": len(messages),
+            "conversation": messages
         }
         
         with open(filename, 'w') as f:
@@ -64,29 +281,65 @@ class ConversationExporter:
         
         logger.info(f"Conversation exported to {filename}")
     
+    # One exporter per (file, session) remembers how far each transcript got;
+    # the least recently used are dropped and rescan the file's tail if needed again
+    _jsonl_exporters: "OrderedDict[Tuple[str, str], JsonlExporter]" = OrderedDict()
+    _jsonl_lock = threading.Lock()
+    _jsonl_max_exporters = int(os.getenv("TUX_EXPORT_MAX_OPEN", 256))
+    
     @staticmethod
-    def generate_report(conversation_history: list) -> dict:
-        """Generate conversation analysis report"""
-        user_messages = [msg for msg in conversation_history if msg["role"] == "user"]
-        assistant_messages = [msg for msg in conversation_history if msg["role"] == "assistant"]
+    def export_to_jsonl(conversation_history, filename: str, session_id: str = "", first_seq: int = 1) -> int:
+        """Append the messages not exported yet to a JSONL transcript (.gz/.zst to compress).
+        
+        Pass the ConversationHistory itself: its messages carry sequence
+        numbers that survive eviction and summary folds. For a plain list of
+        dicts, `first_seq` is the number of its first message. Returns the
+        number of messages written.
+        """
+        key = (os.path.abspath(filename), session_id)
+        exporters = ConversationExporter._jsonl_exporters
+        with ConversationExporter._jsonl_lock:
+            exporter = exporters.get(key)
+            if exporter is None:
+                exporter = exporters[key] = JsonlExporter(filename, session_id)
+                while len(exporters) > ConversationExporter._jsonl_max_exporters:
+                    exporters.popitem(last=False)
+            else:
+                exporters.move_to_end(key)
+            written = exporter.export(conversation_history, first_seq)
+        
+        if written:
+            logger.info(f"Exported {written} new messages to {filename}")
+        return written
+    
+    @staticmethod
+    def export_to_columnar(records, filename: str) -> str:
+        """Export transcript records to Parquet (falls back to CSV); returns the path written"""
+        path = export_columnar(records, filename)
+        logger.info(f"Transcript exported to {path}")
+        return path
+    
+    @staticmethod
+    def generate_report(conversation_history) -> dict:
+        """Generate conversation analysis report in a single pass over the history"""
+        messages = ConversationExporter._as_dicts(conversation_history)
+        stats = TopicStats()
+        stats.add_session(messages)
         
         return {
             "analysis_date": datetime.now().isoformat(),
-            "total_interactions": len(conversation_history),
-            "user_messages": len(user_messages),
-            "assistant_messages": len(assistant_messages),
-            "topics_covered": ConversationExporter._extract_topics(conversation_history)
+            "total_interactions": len(messages),
+            "user_messages": stats.messages["user"],
+            "assistant_messages": stats.messages["assistant"],
+            "topics_covered": list(stats.mentions),
+            "topic_counts": dict(stats.mentions.most_common())
         }
     
     @staticmethod
-    def _extract_topics(conversation_history: list) -> list:
+    def _extract_topics(conversation_history) -> list:
         """Extract main topics from conversation"""
-        topics = []
-        mlops_keywords = ["docker", "kubernetes", "deployment", "model", "mlops", "ci/cd", "rust", "c++", "architecture"]
-        
+        matcher = default_matcher()
+        topics = set()
         for msg in conversation_history:
-            content = msg["content"].lower()
-            found_topics = [topic for topic in mlops_keywords if topic in content]
-            topics.extend(found_topics)
-        
-        return list(set(topics))
\ No newline at end of file
+            topics |= matcher.topics(msg["content"] if isinstance(msg, dict) else msg.content)
+        return list(topics)
@@ -0,0 +1,76 @@
+from circuit_breaker import BreakerRegistry, CircuitBreaker, backoff_delay
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("key1/model", failure_threshold=3, reset_timeout=30, clock=Clock())
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("key1/model", failure_threshold=2, clock=Clock())
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_half_open_probe_closes_on_success():
+    clock = Clock()
+    breaker = CircuitBreaker("key1/model", failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 29
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+
+def test_half_open_probe_reopens_on_failure():
+    clock = Clock()
+    breaker = CircuitBreaker("key1/model", failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    clock.now += 30
+    assert breaker.allow_request()
+
+def test_release_frees_the_probe_without_judging():
+    clock = Clock()
+    breaker = CircuitBreaker("key1/model", failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+def test_registry_keeps_one_breaker_per_key_and_model():
+    clock = Clock()
+    registry = BreakerRegistry(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker = registry.get(0, "model")
+    assert registry.get(0, "model") is breaker
+    assert registry.get(1, "model") is not breaker
+    breaker.record_failure()
+    assert registry.states() == {"key1/model": "open", "key2/model": "closed"}
+    clock.now += 10
+    assert breaker.allow_request()
+
+def test_backoff_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.5, cap=4.0) <= min(4.0, 0.5 * 2 ** attempt)
@@ -0,0 +1,53 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from groq_client import GroqClient
+
+class FakeCompletions:
+    """Blocks every request until released, and counts them"""
+    
+    def __init__(self):
+        self.requests = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+    
+    @property
+    def with_raw_response(self):
+        return self
+    
+    def create(self, **request):
+        self.requests.append(request)
+        self.started.set()
+        assert self.release.wait(5)
+        message = SimpleNamespace(content="Roll back with kubectl rollout undo.")
+        response = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+@pytest.fixture
+def completions(monkeypatch):
+    monkeypatch.delenv("TUX_COALESCE", raising=False)
+    monkeypatch.delenv("TUX_HEDGE", raising=False)
+    return FakeCompletions()
+
+def test_default_and_explicit_max_tokens_share_one_flight(completions):
+    client = GroqClient(api_keys=["key"], client_factory=lambda key: SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    joined = threading.Event()
+    client.flights.on_join = joined.set
+    messages = [{"role": "user", "content": "How do I roll back?"}]
+    
+    answers = []
+    leader = threading.Thread(target=lambda: answers.append(client.chat_completion(messages)))
+    leader.start()
+    assert completions.started.wait(5)
+    follower = threading.Thread(target=lambda: answers.append(client.chat_completion(messages, max_tokens=client.max_tokens)))
+    follower.start()
+    assert joined.wait(5)
+    completions.release.set()
+    leader.join(5)
+    follower.join(5)
+    
+    assert len(completions.requests) == 1
+    assert completions.requests[0]["max_tokens"] == client.max_tokens
+    assert answers == ["Roll back with kubectl rollout undo."] * 2
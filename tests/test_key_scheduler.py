@@ -0,0 +1,85 @@
+import pytest
+
+from key_scheduler import KeyScheduler, KeysExhaustedError, parse_duration
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(autouse=True)
+def no_env_limits(monkeypatch):
+    monkeypatch.delenv("GROQ_REQUESTS_PER_MINUTE", raising=False)
+    monkeypatch.delenv("GROQ_TOKENS_PER_MINUTE", raising=False)
+
+def test_parse_duration():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("3") == 3.0
+    assert parse_duration("") is None and parse_duration("soon") is None
+
+def test_header_sync_sets_the_token_budget():
+    clock = Clock()
+    scheduler = KeyScheduler(1, clock=clock)
+    scheduler.update_from_headers(0, {"x-ratelimit-remaining-tokens": "1500", "x-ratelimit-limit-tokens": "12000"})
+    tokens = scheduler.keys[0].tokens
+    assert tokens.capacity == 12000 and tokens.available(clock.now) == 1500
+    # Refills at the synced capacity per minute
+    clock.now += 30
+    assert tokens.available(clock.now) == 7500
+
+def test_exhausted_requests_and_retry_after_block_the_key():
+    clock = Clock()
+    scheduler = KeyScheduler(2, clock=clock)
+    scheduler.update_from_headers(0, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2m"})
+    assert scheduler.keys[0].blocked_until == clock.now + 120
+    scheduler.update_from_headers(1, {"retry-after": "5"})
+    assert scheduler.keys[1].blocked_until == clock.now + 5
+    # Key 2 frees up first
+    assert scheduler.acquire() == (1, 5.0)
+    with pytest.raises(KeysExhaustedError):
+        scheduler.acquire(max_wait=1)
+
+def test_default_budgets_only_throttle_once_limits_are_reported():
+    clock = Clock()
+    scheduler = KeyScheduler(1, clock=clock)
+    assert not scheduler.keys[0].limited
+    assert all(scheduler.acquire(1000)[1] == 0 for _ in range(50))
+    scheduler.update_from_headers(0, {"x-ratelimit-remaining-tokens": "0", "x-ratelimit-limit-tokens": "6000"})
+    assert scheduler.keys[0].limited
+    assert scheduler.acquire(600)[1] == pytest.approx(6.0)
+
+def test_configured_budgets_throttle_from_the_first_request(monkeypatch):
+    monkeypatch.setenv("GROQ_REQUESTS_PER_MINUTE", "2")
+    scheduler = KeyScheduler(1, clock=Clock())
+    assert scheduler.keys[0].limited
+    assert [scheduler.acquire()[1] for _ in range(3)] == [0, 0, 30.0]
+    assert KeyScheduler(1, requests_per_minute=2, clock=Clock()).keys[0].limited
+
+def test_picks_the_key_with_the_most_headroom():
+    clock = Clock()
+    scheduler = KeyScheduler(3, requests_per_minute=60, tokens_per_minute=6000, clock=clock)
+    scheduler.update_from_headers(0, {"x-ratelimit-remaining-tokens": "1000"})
+    scheduler.update_from_headers(1, {"x-ratelimit-remaining-tokens": "5000"})
+    scheduler.update_from_headers(2, {"x-ratelimit-remaining-tokens": "3000"})
+    assert scheduler.acquire(100)[0] == 1
+    assert scheduler.acquire(100, exclude=[1])[0] == 2
+    assert scheduler.max_headroom() == pytest.approx(4900 / 6000)
+
+def test_rate_limited_key_is_skipped_until_its_cooldown_ends():
+    clock = Clock()
+    scheduler = KeyScheduler(2, requests_per_minute=60, tokens_per_minute=6000, clock=clock)
+    scheduler.record_rate_limited(0, {"retry-after": "10"})
+    assert [scheduler.acquire()[0] for _ in range(3)] == [1, 1, 1]
+    clock.now += 10
+    assert scheduler.acquire()[0] == 0
+
+def test_usage_correction_adjusts_the_reservation():
+    clock = Clock()
+    scheduler = KeyScheduler(1, requests_per_minute=60, tokens_per_minute=6000, clock=clock)
+    scheduler.acquire(1000)
+    scheduler.record_usage(0, 1000, 400)
+    assert scheduler.keys[0].tokens.available(clock.now) == 5600
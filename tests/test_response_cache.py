@@ -0,0 +1,31 @@
+from response_cache import DiskCache, ResponseCache
+
+def test_disk_hits_do_not_write(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"))
+    cache.put("a", "answer")
+    changes = cache.conn.total_changes
+    for _ in range(10):
+        assert cache.get("a") == "answer"
+    assert cache.conn.total_changes == changes
+    assert cache.get("missing") is None
+
+def test_eviction_keeps_recently_read_entries(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.db"), max_bytes=1000)
+    for i in range(9):
+        cache.put(f"k{i}", "x" * 100)
+    # Read the oldest entry so it is no longer the least recently used
+    assert cache.get("k0") is not None
+    cache.put("k9", "x" * 100)
+    cache.put("k10", "x" * 100)
+    assert cache.total_bytes <= 900
+    assert cache.total_bytes == cache.conn.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+    assert cache.get("k0") is not None
+    assert cache.get("k1") is None
+    assert cache.get("k10") is not None
+
+def test_key_depends_on_case_and_answer_budget():
+    messages = [{"role": "user", "content": "  Run kubectl get pods  "}]
+    key = ResponseCache.make_key("m", messages, 0.0, 512)
+    assert key == ResponseCache.make_key("m", [{"role": "user", "content": "Run kubectl get pods"}], 0.0, 512)
+    assert key != ResponseCache.make_key("m", [{"role": "user", "content": "run kubectl get pods"}], 0.0, 512)
+    assert key != ResponseCache.make_key("m", messages, 0.0, 1024)
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+def test_follower_receives_leaders_exception():
+    started, joined, calls = threading.Event(), threading.Event(), []
+    flights = SingleFlight(on_join=joined.set)
+    
+    def fail():
+        calls.append(1)
+        started.set()
+        # Hold the call open until the follower has joined it
+        assert joined.wait(5)
+        raise ValueError("upstream down")
+    
+    errors = []
+    def run():
+        try:
+            flights.do("key", fail)
+        except ValueError as e:
+            errors.append(e)
+    
+    leader = threading.Thread(target=run)
+    leader.start()
+    assert started.wait(5)
+    run()
+    leader.join(5)
+    assert len(calls) == 1
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+def test_late_joiner_replays_buffered_chunks():
+    flights = SingleFlight()
+    first = flights.stream("key", lambda: iter(["a", "b", "c"]))
+    assert [next(first), next(first)] == ["a", "b"]
+    
+    late = flights.stream("key", lambda: pytest.fail("a second upstream call was made"))
+    assert list(late) == ["a", "b", "c"]
+    assert list(first) == ["c"]
+
+def test_last_subscriber_closes_the_source():
+    closed = []
+    
+    def source():
+        try:
+            yield from ("a", "b", "c")
+        finally:
+            closed.append(True)
+    
+    flights = SingleFlight()
+    first = flights.stream("key", source)
+    second = flights.stream("key", source)
+    assert next(first) == "a" and next(second) == "a"
+    first.close()
+    assert not closed
+    assert next(second) == "b"
+    second.close()
+    assert closed == [True]
+    # The abandoned stream is forgotten; the next caller starts a new one
+    assert list(flights.stream("key", lambda: iter(["x"]))) == ["x"]
+
+@pytest.mark.asyncio
+async def test_async_do_cancels_only_when_the_last_waiter_is_cancelled():
+    release, cancelled = asyncio.Event(), []
+    
+    async def call():
+        try:
+            await release.wait()
+            return "answer"
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+    
+    flights = AsyncSingleFlight()
+    first = asyncio.ensure_future(flights.do("key", call))
+    second = asyncio.ensure_future(flights.do("key", call))
+    third = asyncio.ensure_future(flights.do("key", call))
+    await asyncio.sleep(0)
+    
+    first.cancel()
+    second.cancel()
+    await asyncio.sleep(0)
+    assert first.cancelled() and second.cancelled()
+    assert not cancelled
+    
+    release.set()
+    assert await third == "answer"
+    
+    release.clear()
+    fourth = asyncio.ensure_future(flights.do("key", call))
+    await asyncio.sleep(0)
+    fourth.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await fourth
+    await asyncio.sleep(0)
+    assert cancelled == [True]
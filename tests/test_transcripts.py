@@ -0,0 +1,43 @@
+from chatbot import TuxChatbot
+from session_persistence import TurnStore
+from transcripts import read_transcript
+from utils import ConversationExporter, MetricsCollector
+
+class FakeGroqClient:
+    model = "primary"
+    backup_model = "backup"
+    max_tokens = 1024
+    
+    def __init__(self):
+        self.metrics = MetricsCollector()
+    
+    def chat_completion(self, messages, model=None, max_tokens=None):
+        return "Use a readiness probe."
+
+def test_export_continues_after_reset_and_restart(tmp_path, monkeypatch):
+    monkeypatch.setenv("TUX_SUMMARY_THRESHOLD", "1000")
+    monkeypatch.delenv("TUX_KNOWLEDGE_DIR", raising=False)
+    monkeypatch.setattr(ConversationExporter, "_jsonl_exporters", type(ConversationExporter._jsonl_exporters)())
+    db, transcript = str(tmp_path / "sessions.db"), str(tmp_path / "transcript.jsonl")
+    
+    store = TurnStore(db)
+    bot = TuxChatbot(FakeGroqClient(), journal=store.journal("s1"))
+    for i in range(30):
+        bot.process_query(f"question {i}")
+    bot.reset_conversation()
+    for i in range(3):
+        bot.process_query(f"after reset {i}")
+    assert ConversationExporter.export_to_jsonl(bot.conversation_history, transcript, "s1") == 6
+    store.close()
+    
+    # A restarted process has no exporter state and rehydrates from the store
+    ConversationExporter._jsonl_exporters.clear()
+    store = TurnStore(db)
+    bot = TuxChatbot(FakeGroqClient(), journal=store.journal("s1"))
+    bot.process_query("after restart")
+    assert ConversationExporter.export_to_jsonl(bot.conversation_history, transcript, "s1") == 2
+    store.close()
+    
+    records = list(read_transcript(transcript))
+    assert [record["seq"] for record in records] == list(range(61, 69))
+    assert records[-2]["content"] == "after restart"
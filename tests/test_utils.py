@@ -0,0 +1,26 @@
+import json
+
+from history import ConversationHistory
+from utils import ConversationExporter
+
+def _history():
+    history = ConversationHistory()
+    history.append("user", "How do I roll out a Docker image to Kubernetes?")
+    history.append("assistant", "Push it, then kubectl set image. Have a rollback ready.")
+    return history
+
+def test_report_and_topics_accept_conversation_history():
+    history = _history()
+    report = ConversationExporter.generate_report(history)
+    assert report["total_interactions"] == 2
+    assert report["user_messages"] == report["assistant_messages"] == 1
+    assert {"docker", "kubernetes"} <= set(report["topics_covered"])
+    assert set(ConversationExporter._extract_topics(history)) == set(report["topics_covered"])
+    assert set(ConversationExporter._extract_topics(history.to_dicts())) == set(ConversationExporter._extract_topics(history))
+
+def test_export_to_json_accepts_conversation_history(tmp_path):
+    path = tmp_path / "conversation.json"
+    ConversationExporter.export_to_json(_history(), str(path))
+    data = json.loads(path.read_text())
+    assert data["total_messages"] == 2
+    assert data["conversation"][0] == {"role": "user", "content": "How do I roll out a Docker image to Kubernetes?"}